@@ -0,0 +1,194 @@
+import math
+import multiprocessing
+import statistics
+import numpy as np
+
+from ObstgartenDiceTape import batch_slice, open_tape
+from ObstgartenPolicies import get_strategy
+
+"""
+Vectorized Monte Carlo engine: many games in lockstep
+>> The live games are held as one integer array with one column per game: rows [tree, ..., tree, raven]
+   (i.e. the N x (num_trees + 1) state matrix stored transposed, so that every tree is a contiguous row)
+>> Each step throws one die for every live game with a single RNG call
+>> Dice faces: 0, ..., num_trees - 1 = trees, num_trees = raven, above = basket (see ObstgartenRules),
+   i.e. 0-3 = trees, 4 = raven, 5 = basket in the original game
+>> Finished games are retired from the array, so later steps only touch the games still running
+"""
+"""
+Function A: Pick NUM_BASKET fruits for all games that threw the basket (trees: one column per game)
+>> STRATEGY is a name of a built-in strategy or any vectorized strategy (see ObstgartenPolicies)
+>> Returns the number of fruits actually harvested per game (picks are void once all trees are empty)
+"""
+
+
+def pick_baskets(trees, raven, num_basket, strategy, rng):
+    cols = np.arange(trees.shape[1])
+    harvested = np.zeros(trees.shape[1], dtype=trees.dtype)
+    pick_tree = get_strategy(strategy)
+    for i in range(num_basket):
+        pick = pick_tree(trees, raven, num_basket - i, rng)
+        hit = trees[pick, cols] > 0
+        trees[pick, cols] -= hit
+        harvested += hit
+    return harvested
+
+
+"""
+Function B: Play a batch of games until all of them are finished
+>> Returns for every game whether it was won and how many dice were thrown
+>> Optionally the dice are read from a tape with one row per throw and one column per game (instead of the rng),
+   so that the same games can be replayed with different strategies (the rng is still used for random picks)
+"""
+
+
+def play_batch(num_games, num_fruit, num_raven, num_basket, strategy, rng, tape=None, num_trees=4,
+               num_basket_faces=1):
+    victory = np.zeros(num_games, dtype=bool)
+    num_dice = np.zeros(num_games, dtype=np.int64)
+    raven_face = num_trees
+    num_faces = num_trees + 1 + num_basket_faces
+
+    live = np.empty((num_trees + 1, num_games), dtype=np.int16)
+    live[:num_trees] = num_fruit
+    live[raven_face] = num_raven
+    fruits = np.full(num_games, num_trees * num_fruit, dtype=np.int16)
+    ids = np.arange(num_games)
+
+    throw = 0
+    while len(ids) > 0:
+        throw += 1
+        num_live = len(ids)
+        if tape is None:
+            faces = rng.integers(0, num_faces, size=num_live, dtype=np.int8)
+        elif throw <= len(tape):
+            faces = tape[throw - 1][ids].astype(np.int8)
+        else:
+            raise ValueError('Dice tape too short: {} games still running after {} throws'.format(num_live, len(tape)))
+
+        # Normal case: harvest one fruit OR feed raven (flat index into the state array)
+        cols = np.flatnonzero(faces <= raven_face)
+        flat = live.reshape(-1)
+        cells = faces[cols].astype(np.int64) * num_live + cols
+        hit = flat[cells] > 0
+        flat[cells] -= hit
+        fruits[cols[hit & (faces[cols] != raven_face)]] -= 1
+
+        # Special case: basket
+        cols = np.flatnonzero(faces > raven_face)
+        trees = live[:num_trees, cols]
+        fruits[cols] -= pick_baskets(trees, live[raven_face, cols], num_basket, strategy, rng)
+        live[:num_trees, cols] = trees
+
+        # Check if raven or players have won
+        defeat = live[raven_face] == 0
+        won = ~defeat & (fruits == 0)
+        finished = defeat | won
+
+        if finished.any():
+            victory[ids[won]] = True
+            num_dice[ids[finished]] = throw
+            running = ~finished
+            live = live.compress(running, axis=1)
+            fruits = fruits[running]
+            ids = ids[running]
+
+    return victory, num_dice
+
+
+"""
+Function C: Simulate an arbitrary number of games in batches of BATCH_SIZE
+>> Optionally the dice are taken from a pre-generated tape (see ObstgartenDiceTape), starting with game OFFSET
+"""
+
+
+def simulate(num_sim, num_fruit, num_raven, num_basket, strategy, rng, batch_size=10 ** 5, tape=None, offset=0,
+             num_trees=4, num_basket_faces=1):
+    victory = np.empty(num_sim, dtype=bool)
+    num_dice = np.empty(num_sim, dtype=np.int64)
+    for start in range(0, num_sim, batch_size):
+        end = min(start + batch_size, num_sim)
+        batch_tape = None if tape is None else batch_slice(tape, offset + start, offset + end)
+        victory[start:end], num_dice[start:end] = play_batch(end - start, num_fruit, num_raven, num_basket,
+                                                             strategy, rng, tape=batch_tape, num_trees=num_trees,
+                                                             num_basket_faces=num_basket_faces)
+    return victory, num_dice
+
+
+"""
+Function D: Simulate on several processes with independent, reproducible random streams
+>> Every worker gets a child of np.random.SeedSequence(seed) and a fixed share of the games,
+   so the totals are bit-identical for a given seed and number of workers
+>> With a tape file, every worker memory-maps the same tape read-only and replays its own range of games
+>> Returns the number of victories and the total number of dice thrown
+"""
+
+
+def simulate_stream(args):
+    (num_sim, num_fruit, num_raven, num_basket, strategy, seed_sequence, batch_size, tape_path, offset,
+     num_trees, num_basket_faces) = args
+    tape = None if tape_path is None else open_tape(tape_path, num_trees + 1 + num_basket_faces)
+    victory, num_dice = simulate(num_sim, num_fruit, num_raven, num_basket, strategy,
+                                 np.random.default_rng(seed_sequence), batch_size=batch_size,
+                                 tape=tape, offset=offset, num_trees=num_trees, num_basket_faces=num_basket_faces)
+    return int(victory.sum()), int(num_dice.sum())
+
+
+def simulate_parallel(num_sim, num_fruit, num_raven, num_basket, strategy, seed, num_workers, batch_size=10 ** 5,
+                      tape_path=None, num_trees=4, num_basket_faces=1):
+    streams = np.random.SeedSequence(seed).spawn(num_workers)
+    shares = [num_sim // num_workers + (i < num_sim % num_workers) for i in range(num_workers)]
+    offsets = np.cumsum([0] + shares[:-1])
+    tasks = [(share, num_fruit, num_raven, num_basket, strategy, stream, batch_size, tape_path, int(offset),
+              num_trees, num_basket_faces)
+             for share, stream, offset in zip(shares, streams, offsets)]
+
+    with multiprocessing.Pool(processes=num_workers) as pool:
+        results = pool.map(simulate_stream, tasks, chunksize=1)
+
+    num_victories = sum(victories for victories, dice in results)
+    count_num_dice = sum(dice for victories, dice in results)
+    return num_victories, count_num_dice
+
+
+"""
+Function E: Wilson score interval for a winning probability
+>> Returns lower and upper bound for the given confidence level
+"""
+
+
+def wilson_interval(num_victories, num_sim, confidence=0.95):
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    prob = num_victories / num_sim
+    center = (prob + z ** 2 / (2 * num_sim)) / (1 + z ** 2 / num_sim)
+    half_width = z / (1 + z ** 2 / num_sim) * math.sqrt(prob * (1 - prob) / num_sim + z ** 2 / (4 * num_sim ** 2))
+    return center - half_width, center + half_width
+
+
+"""
+Function F: Simulate in chunks until the confidence interval is narrow enough
+>> Stops as soon as the half-width of the Wilson interval is at most TARGET_HALF_WIDTH (or MAX_SIM games are played)
+>> The interval is checked after every chunk, so choose chunks large enough that the repeated checks do not
+   noticeably affect the coverage
+>> Returns the number of games, victories and dice thrown and the final interval
+"""
+
+
+def simulate_until_precision(target_half_width, num_fruit, num_raven, num_basket, strategy, rng,
+                             confidence=0.95, chunk_size=10 ** 5, max_sim=10 ** 8, verbose=False,
+                             num_trees=4, num_basket_faces=1):
+    num_sim = 0
+    num_victories = 0
+    count_num_dice = 0
+    while True:
+        victory, num_dice = play_batch(min(chunk_size, max_sim - num_sim), num_fruit, num_raven, num_basket,
+                                       strategy, rng, num_trees=num_trees, num_basket_faces=num_basket_faces)
+        num_sim += len(victory)
+        num_victories += int(victory.sum())
+        count_num_dice += int(num_dice.sum())
+
+        lower, upper = wilson_interval(num_victories, num_sim, confidence)
+        if verbose:
+            print('{} games: winning probability in [{:.4f}%, {:.4f}%]'.format(num_sim, 100 * lower, 100 * upper))
+        if (upper - lower) / 2 <= target_half_width or num_sim >= max_sim:
+            return num_sim, num_victories, count_num_dice, (lower, upper)
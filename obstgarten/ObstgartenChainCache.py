@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+
+"""
+Persistent cache of sparse transition matrices
+>> The transition matrix only depends on the game parameters (fruits, ravens, baskets, strategy)
+>> Every matrix is stored in its own directory named by a hash of the parameters:
+   data.npy, indices.npy, indptr.npy (CSR arrays) and parameters.json
+>> Plain .npy files (instead of a zipped .npz) allow memory-mapping on load, so only touched pages are read
+>> Bump CACHE_VERSION whenever the construction of the transition matrix changes
+"""
+CACHE_VERSION = 1
+
+
+def cache_key(parameters):
+    text = json.dumps({'version': CACHE_VERSION, 'parameters': parameters}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def save_matrix(path, P, parameters):
+    # Write into a temporary directory first and rename it, so readers never see incomplete entries
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    temporary = tempfile.mkdtemp(dir=parent)
+    P = P.tocsr()
+    np.save(os.path.join(temporary, 'data.npy'), P.data)
+    np.save(os.path.join(temporary, 'indices.npy'), P.indices)
+    np.save(os.path.join(temporary, 'indptr.npy'), P.indptr)
+    with open(os.path.join(temporary, 'parameters.json'), 'w') as file:
+        json.dump({'version': CACHE_VERSION, 'parameters': parameters, 'shape': list(P.shape)}, file)
+    try:
+        os.rename(temporary, path)
+    except OSError:
+        # Another process has stored the same matrix in the meantime
+        shutil.rmtree(temporary)
+
+
+def load_matrix(path, parameters):
+    with open(os.path.join(path, 'parameters.json')) as file:
+        meta = json.load(file)
+    if meta['version'] != CACHE_VERSION or meta['parameters'] != parameters:
+        raise ValueError('Cache entry ' + path + ' does not match the requested parameters')
+    arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in ['data', 'indices', 'indptr']]
+    return sp.csr_matrix(tuple(arrays), shape=tuple(meta['shape']), copy=False)
+
+
+def load_or_build(cache_dir, parameters, build):
+    path = os.path.join(cache_dir, cache_key(parameters))
+    if os.path.isdir(path):
+        return load_matrix(path, parameters)
+    P = build()
+    save_matrix(path, P, parameters)
+    return P
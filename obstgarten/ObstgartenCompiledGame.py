@@ -0,0 +1,198 @@
+import time
+import numpy as np
+
+from ObstgartenOptimalStrategy import check_policy, load_policy, policy_file
+from ObstgartenStateIndex import binomial_table
+from ObstgartenRules import Rules
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # Without numba the functions below simply run as plain Python
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+"""
+Set game parameters
+"""
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
+STRATEGY = 'positive'
+# STRATEGY = 'negative'
+# STRATEGY = 'random'
+# STRATEGY = 'optimal'  # requires the policy table exported by ObstgartenOptimalStrategy.py
+POLICY_FILE = policy_file(RULES)
+
+"""
+Set simulation parameters
+"""
+NUM_SIM = 10 ** 6
+SEED = 54321
+
+"""
+Compiled scalar engine: one game after the other, like game() in ObstgartenMonteCarloSimulation, but
+>> the state is a fixed-size integer array [tree, ..., tree, raven] instead of a dict
+>> dice faces are integers: 0, ..., num_trees - 1 = trees, num_trees = raven, above = basket (see ObstgartenRules)
+>> the whole simulation loop is compiled with numba if it is installed (pure Python otherwise, or with the
+   environment variable NUMBA_DISABLE_JIT=1), which suits very long games or rules that do not batch well
+>> The numba random generator is seeded once per simulation, so results are reproducible for a given SEED,
+   but differ from the other engines
+"""
+POSITIVE = 0
+NEGATIVE = 1
+RANDOM = 2
+TABLE = 3
+STRATEGY_CODES = {'positive': POSITIVE, 'negative': NEGATIVE, 'random': RANDOM, 'optimal': TABLE}
+
+
+"""
+Function A: Select the tree for a single basket pick
+- POSITIVE: always select "fullest" tree (the first one on ties)
+- NEGATIVE: always select "emptiest" tree (provided it's not really empty)
+- RANDOM: select any non-empty tree with equal probability
+- TABLE: look up the canonical state rank in a policy table (see ObstgartenOptimalStrategy)
+"""
+
+
+@njit(cache=True)
+def pick_tree(state, strategy, picks_left, table, binomial, num_raven):
+    num_trees = len(state) - 1
+    selection = 0
+
+    if strategy == POSITIVE:
+        remaining_fruits = 0
+        for t in range(num_trees):
+            if state[t] > remaining_fruits:
+                selection = t
+                remaining_fruits = state[t]
+
+    elif strategy == NEGATIVE:
+        remaining_fruits = state[:num_trees].max()
+        for t in range(num_trees):
+            if remaining_fruits >= state[t] > 0:
+                selection = t
+                remaining_fruits = state[t]
+
+    elif strategy == RANDOM:
+        num_options = 0
+        for t in range(num_trees):
+            if state[t] > 0:
+                num_options += 1
+        if num_options > 0:
+            k = np.random.randint(0, num_options)
+            for t in range(num_trees):
+                if state[t] > 0:
+                    if k == 0:
+                        selection = t
+                        break
+                    k -= 1
+
+    else:
+        trees = np.sort(state[:num_trees])
+        rank = 0
+        for i in range(num_trees):
+            rank += binomial[trees[i] + i, i + 1]
+        position = table[rank * (num_raven + 1) + state[num_trees], picks_left - 1]
+        if position >= 0:
+            # Any tree with the chosen number of fruits is equivalent
+            value = trees[num_trees - 1 - position]
+            for t in range(num_trees):
+                if state[t] == value:
+                    selection = t
+                    break
+
+    return selection
+
+
+"""
+Function B: One whole game on the given state array (modified in place)
+>> Returns whether the game was won and the number of dice thrown
+"""
+
+
+@njit(cache=True)
+def game(state, num_basket, strategy, table, binomial, num_raven, num_basket_faces):
+    num_trees = len(state) - 1
+    num_dice = 0
+    while True:
+        face = np.random.randint(0, num_trees + 1 + num_basket_faces)
+        num_dice += 1
+
+        # Special case: basket
+        if face > num_trees:
+            for i in range(num_basket):
+                t = pick_tree(state, strategy, num_basket - i, table, binomial, num_raven)
+                if state[t] > 0:
+                    state[t] -= 1
+
+        # Normal case: harvest one fruit OR feed raven
+        elif state[face] > 0:
+            state[face] -= 1
+
+        # Check if raven or players have won
+        if state[num_trees] == 0:
+            return False, num_dice
+        if state[:num_trees].sum() == 0:
+            return True, num_dice
+
+
+"""
+Function C: Simulate NUM_SIM games
+>> Returns the number of victories and the total number of dice thrown
+"""
+
+
+@njit(cache=True)
+def simulate_games(num_sim, num_fruit, num_raven, num_basket, strategy, table, binomial, seed, num_trees,
+                   num_basket_faces):
+    np.random.seed(seed)
+    state = np.empty(num_trees + 1, dtype=np.int64)
+    num_victories = 0
+    count_num_dice = 0
+    for s in range(num_sim):
+        state[:num_trees] = num_fruit
+        state[num_trees] = num_raven
+        victory, num_dice = game(state, num_basket, strategy, table, binomial, num_raven, num_basket_faces)
+        num_victories += victory
+        count_num_dice += num_dice
+    return num_victories, count_num_dice
+
+
+def simulate(num_sim, num_fruit, num_raven, num_basket, strategy, seed, policy=None, num_trees=4, num_basket_faces=1):
+    if strategy not in STRATEGY_CODES:
+        raise ValueError('Unknown strategy: ' + str(strategy))
+    if strategy == 'optimal':
+        # The compiled code does no bounds checking, a table of other rules would be read out of place
+        check_policy(policy, Rules(num_trees, num_fruit, num_raven, num_basket, num_basket_faces))
+        if str(policy.get('indexing', 'canonical')) != 'canonical':
+            raise ValueError('The compiled engine needs a policy table indexed by canonical state rank')
+        table = np.asarray(policy['policy'])
+    else:
+        # Placeholder with the same type, so that the compiled function is reused
+        table = np.zeros((1, num_basket), dtype=np.int8)
+    binomial = binomial_table(num_fruit + num_trees, num_trees)
+    return simulate_games(num_sim, num_fruit, num_raven, num_basket, STRATEGY_CODES[strategy], table, binomial, seed,
+                          num_trees, num_basket_faces)
+
+
+if __name__ == "__main__":
+
+    policy = load_policy(POLICY_FILE, RULES) if STRATEGY == 'optimal' else None
+
+    # The first call includes the compilation (or loading it from the numba cache)
+    time_start = time.time()
+    simulate(1, strategy=STRATEGY, seed=SEED, policy=policy, **RULES._asdict())
+    print('JIT compilation: ' + ('{:.2f} s'.format(time.time() - time_start) if HAVE_NUMBA else 'not available'))
+
+    time_start = time.time()
+    num_victories, count_num_dice = simulate(NUM_SIM, strategy=STRATEGY, seed=SEED, policy=policy, **RULES._asdict())
+    duration = time.time() - time_start
+
+    prob = num_victories / NUM_SIM
+    print('Final winning probability: ' + str(prob) + ' = ' + '{:.2f}'.format(round(100 * prob, 2)) + '%')
+    print('Average number of dice thrown per round: ' + str(count_num_dice / NUM_SIM))
+    print('Games per second: {:.0f}'.format(NUM_SIM / duration))
@@ -0,0 +1,104 @@
+import json
+import time
+import numpy as np
+
+from ObstgartenRules import Rules
+
+"""
+Set tape parameters
+>> The die of RULES determines the faces on the tape, the raven path its default length
+"""
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
+NUM_GAMES = 10 ** 6
+SEED = 54321
+TAPE_FILE = 'dice_tape.npy'
+
+"""
+Pre-generated dice tape
+>> One row per game, one column per throw, values 0-5 = cherry, apple, pear, plum, raven, basket (uint8)
+   (or the dice faces of a variant with num_faces faces, see ObstgartenRules)
+>> Stored as a plain .npy file that is memory-mapped read-only, so several worker processes share the same pages;
+   the number of faces is stored next to it (<tape file>.json) and checked against the rules when the tape is opened,
+   since a tape of a smaller die would silently never show the extra faces
+>> Replaying the same tape with different strategies (Monte Carlo engines or the DRL environment) yields
+   exact A/B comparisons: game g always sees the same sequence of dice
+>> The raven is fed with every 6th throw on average (every num_faces-th in general), so
+   32 * (num_raven + 1) * num_faces / 6 throws are (practically) never exceeded
+"""
+
+
+def default_tape_length(num_raven, num_faces=6):
+    return -(-32 * (num_raven + 1) * num_faces // 6)
+
+
+"""
+Function A: Generate a tape in memory
+"""
+
+
+def generate_tape(num_games, num_raven, rng, tape_length=None, num_faces=6):
+    if tape_length is None:
+        tape_length = default_tape_length(num_raven, num_faces)
+    return rng.integers(0, num_faces, size=(num_games, tape_length), dtype=np.uint8)
+
+
+"""
+Function B: Generate a tape on disk in chunks of games (bounded memory)
+"""
+
+
+def tape_info_path(path):
+    return path + '.json'
+
+
+def write_tape(path, num_games, num_raven, seed, tape_length=None, chunk_size=10 ** 5, num_faces=6):
+    if tape_length is None:
+        tape_length = default_tape_length(num_raven, num_faces)
+    rng = np.random.default_rng(seed)
+    tape = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(num_games, tape_length))
+    for start in range(0, num_games, chunk_size):
+        end = min(start + chunk_size, num_games)
+        tape[start:end] = generate_tape(end - start, num_raven, rng, tape_length, num_faces)
+    tape.flush()
+    del tape
+    with open(tape_info_path(path), 'w') as file:
+        json.dump({'num_games': num_games, 'tape_length': tape_length, 'num_faces': num_faces, 'seed': seed}, file)
+
+
+"""
+Function C: Open a tape read-only without loading it
+>> With num_faces given, the tape has to be written for a die with exactly that many faces
+"""
+
+
+def open_tape(path, num_faces=None):
+    if num_faces is not None:
+        try:
+            with open(tape_info_path(path)) as file:
+                tape_faces = json.load(file)['num_faces']
+        except FileNotFoundError:
+            raise ValueError('Dice tape {} has no face count ({} is missing), regenerate it with '
+                             'ObstgartenDiceTape.py'.format(path, tape_info_path(path)))
+        if tape_faces != num_faces:
+            raise ValueError('Dice tape {} has {} faces, the rules need {}'.format(path, tape_faces, num_faces))
+    return np.load(path, mmap_mode='r')
+
+
+"""
+Function D: Dice of the games start, ..., end - 1 for the batch engine (one row per throw, one column per game)
+"""
+
+
+def batch_slice(tape, start, end):
+    return np.ascontiguousarray(tape[start:end].T)
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+    write_tape(TAPE_FILE, NUM_GAMES, RULES.num_raven, SEED, num_faces=RULES.num_faces)
+    tape = open_tape(TAPE_FILE, RULES.num_faces)
+    print('Tape with {} games x {} throws ({} faces) written to {} in {:.1f} s'.format(
+        tape.shape[0], tape.shape[1], RULES.num_faces, TAPE_FILE, time.time() - time_start))
+    print('Relative frequencies: ' + ', '.join('{} {:.4f}'.format(symbol, frequency) for symbol, frequency in zip(
+        RULES.symbols, np.bincount(tape[:1000].ravel(), minlength=RULES.num_faces) / tape[:1000].size)))
@@ -0,0 +1,82 @@
+import numpy as np
+import time
+
+from ObstgartenStateIndex import num_states, rank_state, unrank_states
+from ObstgartenTransitions import transitions
+from ObstgartenRules import Rules
+
+"""
+Set game parameters
+>> Uncomment the STRATEGY you want to use
+"""
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
+STRATEGY = 'positive'
+# STRATEGY = 'negative'
+# STRATEGY = 'random'
+
+"""
+Dynamic programming without transition matrix
+>> Every throw either removes a fruit or feeds the raven, unless the thrown tree is already empty (self-loop)
+>> Hence all successors of a state carry fewer remaining items (fruits + raven), apart from the state itself
+>> Sweeping the states level by level (ascending number of remaining items) solves the chain in one pass:
+   V(s) = sum_{s' != s} p(s, s') * V(s') / (1 - p(s, s))
+"""
+
+
+"""
+Function A: Winning probability for all states (indexed by rank)
+"""
+
+
+def win_probabilities(num_fruit, num_raven, num_basket, strategy, num_trees=4, num_basket_faces=1):
+    ranks = np.arange(num_states(num_fruit, num_raven, num_trees))
+    states = unrank_states(ranks, num_fruit, num_raven, num_trees)
+    fruits = states[:, :-1].sum(axis=1)
+    raven = states[:, -1]
+
+    # Successor ranks and probabilities of all dice faces, one column per outcome
+    successors, probs = transitions(states, num_raven, num_basket, strategy, num_basket_faces)
+
+    value = ((fruits == 0) & (raven > 0)).astype(float)
+    is_transitive = (fruits > 0) & (raven > 0)
+    level = fruits + raven
+
+    # Sweep all transitive states in ascending order of remaining items
+    order = np.flatnonzero(is_transitive)
+    order = order[np.argsort(level[order], kind='stable')]
+    boundaries = np.flatnonzero(np.diff(level[order])) + 1
+    for idx in np.split(order, boundaries):
+        succ = successors[idx]
+        p = probs[idx]
+        is_self = succ == idx[:, np.newaxis]
+        p_self = (p * is_self).sum(axis=1)
+        value[idx] = (p * ~is_self * value[succ]).sum(axis=1) / (1 - p_self)
+
+    return value
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+    value = win_probabilities(strategy=STRATEGY, **RULES._asdict())
+    start_state = [RULES.num_fruit] * RULES.num_trees + [RULES.num_raven]
+    start = rank_state(start_state, RULES.num_raven)
+    print('Winning probability with start in state ' + str(start_state) + ' = ')
+    print('{:.2f}'.format(round(100 * value[start], 2)) + '%')
+    print('Duration of analysis: {:.1f} ms'.format(1000 * (time.time() - time_start)))
+
+    """
+    Parameter sweep over number of fruits and ravens
+    """
+    print('Winning probabilities [%] for strategy ' + STRATEGY + ' with ' + str(RULES.num_basket) + ' baskets:')
+    print('fruit \\ raven ' + ' '.join('{:>6}'.format(r) for r in range(1, RULES.num_raven + 1)))
+    time_start = time.time()
+    for f in range(1, RULES.num_fruit + 1):
+        row = []
+        for r in range(1, RULES.num_raven + 1):
+            value = win_probabilities(strategy=STRATEGY, **RULES._replace(num_fruit=f, num_raven=r)._asdict())
+            row.append(100 * value[-1])
+        print('{:>13} '.format(f) + ' '.join('{:>6.2f}'.format(v) for v in row))
+    time_sweep = time.time() - time_start
+    print('Duration of sweep: {:.1f} ms ({:.1f} ms per configuration)'.format(
+        1000 * time_sweep, 1000 * time_sweep / (RULES.num_fruit * RULES.num_raven)))
@@ -1,321 +1,273 @@
 import numpy as np
-import pandas as pd
-import sys
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 import time
 import datetime
 
-# Measure time
-time_start = time.time()
+from ObstgartenStateIndex import rank_state, num_states, unrank_states
+from ObstgartenTransitions import transitions
+from ObstgartenChainCache import load_or_build
+from ObstgartenRules import Rules
 
 """
 Set game parameters
+>> Variants with more trees, a longer raven path or several basket faces: change RULES (see ObstgartenRules)
 >> Uncomment the STRATEGY you want to use
->> Caution: random calculation takes a long time due to additional calculations
 """
-NUM_FRUIT = 10
-NUM_RAVEN = 9
-NUM_BASKET = 2
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
 STRATEGY = 'positive'
 # STRATEGY = 'negative'
 # STRATEGY = 'random'
+GAME_LENGTH_DISTRIBUTION = True  # additionally propagate the distribution of the number of dice thrown
+CACHE_DIR = 'chain_cache'  # directory for persistent transition matrices, None disables the cache
 
 """
-Define and calculate all possible states (as a list):
+Function A: Define and classify all possible states
+>> One row per state [fullest tree, 2nd fullest tree, ..., emptiest tree, crow] in an integer array
+>> Rows are in ascending rank order (see ObstgartenStateIndex), i.e. row index == rank
+>> Only the canonical (sorted) states are enumerated: binom(num_fruit + num_trees, num_trees) * (num_raven + 1)
+   instead of (num_fruit + 1)^num_trees * (num_raven + 1), e.g. 80 thousand instead of 18 million for 6 trees
+>> Boolean masks mark the four classes of states
 """
-print('Initialize states:')
-print('definition: [fullest tree, 2nd fullest tree, 3rd fullest tree, emptiest tree, crow]')
-print('start: [10, 10, 10, 10, 9]')
-print('victory : [0, 0, 0, 0, x_e], where x_e > 0')
-print('defeat: [x_a, x_b, x_c, x_d, 0], where at least one x_i > 0')
-
-current = [NUM_FRUIT, NUM_FRUIT, NUM_FRUIT, NUM_FRUIT, NUM_RAVEN]
-states = []
-
-states_transitive = []
-states_victory = []
-states_defeat = []
-states_impossible = []
-
-index_transitive = []
-index_victory = []
-index_defeat = []
-index_impossible = []
-
-counter = 0
-
-for a in range(NUM_FRUIT, -1, -1):
-    current[0] = a
-    for b in range(a, -1, -1):
-        current[1] = b
-        for c in range(b, -1, -1):
-            current[2] = c
-            for d in range(c, -1, -1):
-                current[3] = d
-                # e is the raven and therefore independent from the rest
-                for e in range(NUM_RAVEN, -1, -1):
-                    current[4] = e
-
-                    # CASE DISTINCTION
-
-                    # Impossible state:
-                    if np.logical_and(sum(current[0:4]) == 0, current[4] == 0):
-                        index_impossible.append(counter)
-                        states_impossible.append(current)
-                    # Victory
-                    elif np.logical_and(sum(current[0:4]) == 0, current[4] != 0):
-                        index_victory.append(counter)
-                        states_victory.append(current)
-                    # Defeat
-                    elif np.logical_and(sum(current[0:4]) != 0, current[4] == 0):
-                        index_defeat.append(counter)
-                        states_defeat.append(current)
-                    # Transitive
-                    else:
-                        index_transitive.append(counter)
-                        states_transitive.append(current)
-                        # print('Transitiv')
-                    states.append(current)
-                    counter += 1
-                    current = current[:]
-
-print('Transitive states: ' + str(len(states_transitive)))
-print('Victorious states: ' + str(len(states_victory)))
-print('Defeated states: ' + str(len(states_defeat)))
-print('Unreachable states: ' + str(len(states_impossible)))
 
-"""
-Create transition matrix
-"""
-states_string = []
 
-for i in states:
-    states_string.append(str(i))
+def enumerate_states(num_fruit, num_raven, num_trees=4):
+    states = unrank_states(np.arange(num_states(num_fruit, num_raven, num_trees)), num_fruit, num_raven, num_trees)
 
-P = pd.DataFrame(index=states_string, columns=states_string)
-P.iloc[:, :] = 0
+    has_fruit = states[:, :-1].any(axis=1)
+    has_raven = states[:, -1] > 0
 
-print('Number of total states: ' + str(P.shape[0]) + ' [' + str(P.shape[0] - 1) + ' without the impossible one]')
-print('Size of array in memory: ' + str(sys.getsizeof(P)))
+    is_transitive = has_fruit & has_raven
+    is_victory = ~has_fruit & has_raven
+    is_defeat = has_fruit & ~has_raven
+    is_impossible = ~has_fruit & ~has_raven
+
+    return states, is_transitive, is_victory, is_defeat, is_impossible
 
-"""
-Fill transition matrix:
-"""
 
 """
-Step 1: Calculate transition probabilities
+Function B: Create sparse transition matrix
+>> Every state is identified by its rank (= row index)
+>> The outgoing (row, col, prob) triples of all transitive states are computed at once (see ObstgartenTransitions),
+   each transitive row has at most num_trees + 1 + binom(NUM_BASKET + num_trees - 1, num_trees - 1) non-zeros
+   (fruits, raven, basket outcomes)
+>> Absorbing states (victory, defeat, impossible) only lead to themselves
 """
-print('Calculate transitive states: ')
-time_before = time.time()
-count = 0
-times = []
-
-for incoming in states_transitive:
-    if count % 1000 == 0:
-        time_after = time.time()
-        difference = time_after - time_before
-        print("{} states calculated after {} seconds.".format(count, difference))
-        times.append(difference)
-        time_before = time_after
-    count += 1
-    """ 
-    Case distinction: 
-    1) Regular fruit
-    2) Crow
-    3) Basket
-    """
 
-    """
-    Case 1: Regular fruit, i.e. 4 possible transitions >> i = 0,1,2,3
-    All of these in-out-combinations get probability +1/6 (here +1, because we'll divide by 6 later) 
-    """
-    for i in range(0, 4):
-        outgoing = incoming[:]  # create copy
-        outgoing[i] = max(outgoing[i] - 1, 0)  # reduce specific tree by one fruit
-        outgoing[0:4] = sorted(outgoing[0:4], reverse=True)  # sort trees in ascending order
 
-        P.loc[str(incoming), str(outgoing)] = P.loc[str(incoming), str(outgoing)] + 1
+def build_transition_matrix(states, is_transitive, num_raven, num_basket, strategy, num_basket_faces=1):
+    index_transitive = np.flatnonzero(is_transitive)
+    index_absorbing = np.flatnonzero(~is_transitive)
 
-    """
-    Case 2: Crow >> Reduce crow by 1, if possible
-    """
-    outgoing = incoming[:]
-    outgoing[4] = max(outgoing[4] - 1, 0)
+    successors, probs = transitions(states[index_transitive], num_raven, num_basket, strategy, num_basket_faces)
+    rows = np.repeat(index_transitive, successors.shape[1])
+    cols = successors.ravel()
+    probs = probs.ravel()
+    relevant = probs > 0
 
-    P.loc[str(incoming), str(outgoing)] = P.loc[str(incoming), str(outgoing)] + 1
+    rows = np.concatenate((rows[relevant], index_absorbing))
+    cols = np.concatenate((cols[relevant], index_absorbing))
+    probs = np.concatenate((probs[relevant], np.ones(len(index_absorbing))))
 
-    """
-    Case 3: Basket: pick 2 fruits
-    - STRATEGY "positive": always pick "fullest" tree
-    - STRATEGY "negative": always pick "emptiest" tree
-    - STRATEGY "random": pick tree randomly
-    """
+    # Duplicate (row, col) pairs are summed up when the sparse matrix is compressed
+    P = sp.coo_matrix((probs, (rows, cols)), shape=(len(states), len(states)))
+    return P.tocsr()
 
-    # Positive & negative relatively simple calculation
-    outgoing = incoming[:]  # create copy
-
-    if STRATEGY == 'positive':
-        for i in range(0, NUM_BASKET):
-            outgoing[0] = max(outgoing[0] - 1, 0)  # reduce 1st (fullest) tree
-            outgoing[0:4] = sorted(outgoing[0:4], reverse=True)  # re-sort tree in descending order
-        P.loc[str(incoming), str(outgoing)] = P.loc[str(incoming), str(outgoing)] + 1
-
-    elif STRATEGY == 'negative':
-        for i in range(0, NUM_BASKET):
-            if outgoing[3] != 0:  # reduce emptiest tree (index = 3), if possible
-                outgoing[3] = max(outgoing[3] - 1, 0)
-            elif outgoing[2] != 0:  # otherwise the 2nd emptiest, etc.
-                outgoing[2] = max(outgoing[2] - 1, 0)
-            elif outgoing[1] != 0:
-                outgoing[1] = max(outgoing[1] - 1, 0)
-            else:
-                outgoing[0] = max(outgoing[0] - 1, 0)
-            outgoing[0:4] = sorted(outgoing[0:4], reverse=True)
-        P.loc[str(incoming), str(outgoing)] = P.loc[str(incoming), str(outgoing)] + 1
-
-    # Now it's getting complicated: there are several possible outgoing states
-    elif STRATEGY == 'random':
-        current_outgoing_list = []
-
-        # Create nested list with one layer (consisting of outgoing state and prob) for each element in the basket
-        current_outgoing_list.append([[outgoing, 1]])
-
-        for i in range(0, NUM_BASKET):
-
-            # Append new list to main list for every basket
-            current_outgoing_list.append([])
-
-            # Iterate over all outgoing states:
-            for zu in current_outgoing_list[i]:
-                outgoing = zu[0].copy()
-                prob_outgoing = zu[1]
-
-                # If all 4 trees carry fruits, then prob = 1/4
-                if outgoing[3] != 0:
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[3] = max(outgoing_temp[3] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 4])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[2] = max(outgoing_temp[2] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 4])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[1] = max(outgoing_temp[1] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 4])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[0] = max(outgoing_temp[0] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 4])
-                # 3 fruits = 1/3
-                elif outgoing[2] != 0:
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[2] = max(outgoing_temp[2] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 3])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[1] = max(outgoing_temp[1] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 3])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[0] = max(outgoing_temp[0] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 3])
-                # prob = 1/2
-                elif outgoing[1] != 0:
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[1] = max(outgoing_temp[1] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 2])
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[0] = max(outgoing_temp[0] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1 / 2])
-                # prob =  1
-                else:
-                    outgoing_temp = outgoing.copy()
-                    outgoing_temp[0] = max(outgoing_temp[0] - 1, 0)
-                    outgoing_temp[0:4] = sorted(outgoing_temp[0:4], reverse=True)
-                    current_outgoing_list[i + 1].append([outgoing_temp, prob_outgoing * 1])
-
-        # The list contains the relevant states at the very end
-        # With 2 baskets we have 4*4 possible outgoing states (some appear multiple times)
-        # Plausibility check: all probs must add up to 1
-
-        outgoing_dict = {}
-        # Access elements at the end of the list [NUM_BASKET]
-        for jga in current_outgoing_list[NUM_BASKET]:
-            outgoing = jga[0].copy()
-            outgoing_str = str(outgoing)
-            if outgoing_str in outgoing_dict:
-                outgoing_dict[outgoing_str] += jga[1]
-            else:
-                outgoing_dict[outgoing_str] = jga[1]
-
-        # Now iterate over the dict
-        cumulated_proba = 0
-        for outgoing_str in outgoing_dict:
-            cumulated_proba += outgoing_dict[outgoing_str]
-            P.loc[str(incoming), outgoing_str] += outgoing_dict[outgoing_str]
-    # This should never happen
-    else:
-        outgoing[0] = max(outgoing[0] - 1, 0)
-        print('ERROR!')
 
 """
-Step 2: Fill absorbing states
+Function C: Transition matrix from the persistent cache (see ObstgartenChainCache), built on the first request
 """
-print('Fill absorbing states: ')
-for incoming in states_victory:
-    P.loc[str(incoming), str(incoming)] = P.loc[str(incoming), str(incoming)] + 6
-for incoming in states_defeat:
-    P.loc[str(incoming), str(incoming)] = P.loc[str(incoming), str(incoming)] + 6
-for incoming in states_impossible:
-    P.loc[str(incoming), str(incoming)] = P.loc[str(incoming), str(incoming)] + 6
+
+
+def cached_transition_matrix(states, is_transitive, num_fruit, num_raven, num_basket, strategy, cache_dir=CACHE_DIR,
+                             num_basket_faces=1):
+    if cache_dir is None:
+        return build_transition_matrix(states, is_transitive, num_raven, num_basket, strategy, num_basket_faces)
+    parameters = {'num_trees': int(states.shape[1] - 1), 'num_fruit': int(num_fruit), 'num_raven': int(num_raven),
+                  'num_basket': int(num_basket), 'num_basket_faces': int(num_basket_faces), 'strategy': strategy}
+    return load_or_build(cache_dir, parameters,
+                         lambda: build_transition_matrix(states, is_transitive, num_raven, num_basket, strategy,
+                                                         num_basket_faces))
+
 
 """
-Step 3: Finalize transition matrix
+Function D: Absorption analysis for all start states at once
+>> Write P = [[Q, R], [0, I]] with Q = transitive block, then (I - Q) x = R b yields the absorption probabilities
+>> All transitions lead to states with lower rank (apart from self-loops), so I - Q is lower triangular
+>> and a single forward substitution in rank order solves for all right-hand sides simultaneously:
+   1) probability of reaching a victorious state
+   2) probability of reaching a defeated state
+   3) expected number of dice thrown until absorption
 """
-P = P / 6
-row_sum = P.sum(axis=1)
-problematic_rows = (row_sum.values != 1.0).sum()
-# print(problematic_rows)
 
-# Failing plausi-check might be due to rounding errors (because of dividing by 6)!
-if problematic_rows == 0:
-    print('plausibility check passed')
-else:
-    print('plausibility check failed')
+
+def absorption_analysis(P, is_transitive, is_victory, is_defeat):
+    P = P.tocsr()
+    index_transitive = np.flatnonzero(is_transitive)
+    n_transitive = len(index_transitive)
+
+    Q = P[index_transitive, :][:, index_transitive]
+    if sp.triu(Q, k=1).nnz > 0:
+        raise ValueError('Transitive states are not sorted in topological (rank) order')
+    I_minus_Q = (sp.identity(n_transitive, format='csr') - Q).tocsr()
+
+    rhs = np.empty((n_transitive, 3))
+    rhs[:, 0] = np.asarray(P[index_transitive, :][:, np.flatnonzero(is_victory)].sum(axis=1)).ravel()
+    rhs[:, 1] = np.asarray(P[index_transitive, :][:, np.flatnonzero(is_defeat)].sum(axis=1)).ravel()
+    rhs[:, 2] = 1
+    x = spla.spsolve_triangular(I_minus_Q, rhs, lower=True)
+
+    # Absorbing states are trivially decided after zero throws
+    win = np.zeros(P.shape[0])
+    loss = np.zeros(P.shape[0])
+    length = np.zeros(P.shape[0])
+    win[is_victory] = 1
+    loss[is_defeat] = 1
+    win[index_transitive] = x[:, 0]
+    loss[index_transitive] = x[:, 1]
+    length[index_transitive] = x[:, 2]
+    return win, loss, length
 
 
 """
-Calculate probability for entering the stationary set
->> It suffices to calculate the winning probability
+Function E: Exact distribution of the number of dice thrown
+>> Propagate the probability vector of the transitive states throw by throw (sparse mat-vec, no matrix powers)
+   until less than TOLERANCE of the probability mass is still in play
+>> Returns per throw t = 1, 2, ...:
+   1) win hazard: probability of winning with throw t, given that the game is still running before throw t
+   2) loss hazard: probability of losing with throw t, given that the game is still running before throw t
+   3) survival: probability that the game is still running before throw t
+>> Unconditional probabilities of ending with throw t are hazard * survival
+>> An absorbing start state (game already decided) yields empty arrays: no dice are thrown
 """
-# The transitive matrix is always the same
-P_transitive = P.iloc[index_transitive, index_transitive].copy(deep=True)
-P_transitive = P_transitive - np.identity(P_transitive.shape[0])
+
+
+def game_length_distribution(P, is_transitive, is_victory, is_defeat, start, tolerance=1e-12):
+    if not is_transitive[start]:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    P = P.tocsr()
+    index_transitive = np.flatnonzero(is_transitive)
+
+    # Transposed transitive block for forward propagation, plus the one-step absorption probabilities
+    Q_transposed = P[index_transitive, :][:, index_transitive].T.tocsr()
+    r_win = np.asarray(P[index_transitive, :][:, np.flatnonzero(is_victory)].sum(axis=1)).ravel()
+    r_loss = np.asarray(P[index_transitive, :][:, np.flatnonzero(is_defeat)].sum(axis=1)).ravel()
+
+    p = np.zeros(len(index_transitive))
+    p[np.searchsorted(index_transitive, start)] = 1
+
+    win_hazard = []
+    loss_hazard = []
+    survival = []
+    alive = p.sum()
+    while alive > tolerance:
+        survival.append(alive)
+        win_hazard.append(p @ r_win / alive)
+        loss_hazard.append(p @ r_loss / alive)
+        p = Q_transposed @ p
+        alive = p.sum()
+
+    return np.array(win_hazard), np.array(loss_hazard), np.array(survival)
+
 
 """
-Iterate over all victorious states:
+Function F: Complete analysis of one configuration
+>> Pass a precomputed enumeration (result of enumerate_states) to reuse it across baskets and strategies
 """
-winning_prob = 0
-for relevant in states_victory:
-    print('Analyze victorious state ' + str(relevant) + ' = ', end='')
 
-    # Write relevant column - i.e. the result vector
-    relevant_column = P.iloc[index_transitive, states.index(relevant)].copy(deep=True)
+
+def analyze_chain(num_fruit, num_raven, num_basket, strategy, enumeration=None, cache_dir=CACHE_DIR,
+                  num_trees=4, num_basket_faces=1):
+    time_before = time.time()
+    if enumeration is None:
+        enumeration = enumerate_states(num_fruit, num_raven, num_trees)
+    states, is_transitive, is_victory, is_defeat, is_impossible = enumeration
+
+    P = cached_transition_matrix(states, is_transitive, num_fruit, num_raven, num_basket, strategy, cache_dir,
+                                 num_basket_faces)
+    win, loss, length = absorption_analysis(P, is_transitive, is_victory, is_defeat)
+    start = rank_state([num_fruit] * num_trees + [num_raven], num_raven)
+
+    return {'num_trees': num_trees,
+            'num_fruit': num_fruit,
+            'num_raven': num_raven,
+            'num_basket': num_basket,
+            'num_basket_faces': num_basket_faces,
+            'strategy': strategy,
+            'num_states': len(states),
+            'num_nonzero': P.nnz,
+            'win': win[start],
+            'loss': loss[start],
+            'length': length[start],
+            'duration': time.time() - time_before}
+
+
+if __name__ == "__main__":
+
+    # Measure time
+    time_start = time.time()
+
+    print('Initialize states:')
+    print('definition: [fullest tree, 2nd fullest tree, ..., emptiest tree, crow]')
+    print('start: ' + str([RULES.num_fruit] * RULES.num_trees + [RULES.num_raven]))
+    print('victory : [0, ..., 0, x_e], where x_e > 0')
+    print('defeat: [x_a, ..., x_d, 0], where at least one x_i > 0')
+
+    states, is_transitive, is_victory, is_defeat, is_impossible = enumerate_states(RULES.num_fruit, RULES.num_raven,
+                                                                                   RULES.num_trees)
+
+    print('Transitive states: ' + str(is_transitive.sum()))
+    print('Victorious states: ' + str(is_victory.sum()))
+    print('Defeated states: ' + str(is_defeat.sum()))
+    print('Unreachable states: ' + str(is_impossible.sum()))
+    print('Number of total states: ' + str(len(states)) + ' [' + str(len(states) - 1) + ' without the impossible one]')
+    print('Number of raw (unsorted) states: ' + str((RULES.num_fruit + 1) ** RULES.num_trees * (RULES.num_raven + 1)))
+
+    print('Calculate transition matrix: ')
+    time_before = time.time()
+    P = cached_transition_matrix(states, is_transitive, RULES.num_fruit, RULES.num_raven, RULES.num_basket, STRATEGY,
+                                 num_basket_faces=RULES.num_basket_faces)
+    print('Transition matrix calculated after {} seconds.'.format(time.time() - time_before))
+    print('Non-zero entries: ' + str(P.nnz))
+    print('Size of array in memory: ' + str(P.data.nbytes + P.indices.nbytes + P.indptr.nbytes))
+
+    row_sum = np.asarray(P.sum(axis=1)).ravel()
+    problematic_rows = (~np.isclose(row_sum, 1.0)).sum()
+
+    if problematic_rows == 0:
+        print('plausibility check passed')
+    else:
+        print('plausibility check failed')
 
     """
-    Solve linear system of equations
+    Absorption analysis with start in the initial state (highest rank)
     """
-    x = np.linalg.solve(P_transitive.apply(pd.to_numeric).values, -relevant_column.apply(pd.to_numeric).values)
+    win, loss, length = absorption_analysis(P, is_transitive, is_victory, is_defeat)
+    start = rank_state([RULES.num_fruit] * RULES.num_trees + [RULES.num_raven], RULES.num_raven)
 
-    print('{:.2f}'.format(round(100 * x[0], 2)) + '%')
-    winning_prob += x[0]
-print('Winning probability with start in state ' + str(states[0]) + ' = ')
-print('{:.2f}'.format(round(100 * winning_prob, 2)) + '%')
+    print('Winning probability with start in state ' + str(states[start].tolist()) + ' = ')
+    print('{:.2f}'.format(round(100 * win[start], 2)) + '%')
+    print('Losing probability: ' + '{:.2f}'.format(round(100 * loss[start], 2)) + '%')
+    print('Expected number of dice thrown per round: ' + '{:.2f}'.format(length[start]))
 
-time_end = time.time()
-time_overall = time_end - time_start
-print('Overall duration of analysis: ' + str(datetime.timedelta(seconds=time_overall)))
+    """
+    Distribution of the number of dice thrown
+    """
+    if GAME_LENGTH_DISTRIBUTION:
+        win_hazard, loss_hazard, survival = game_length_distribution(P, is_transitive, is_victory, is_defeat, start)
+        win_pmf = win_hazard * survival
+        loss_pmf = loss_hazard * survival
+        throws = np.arange(1, len(survival) + 1)
+        cdf = np.cumsum(win_pmf + loss_pmf)
+
+        print('Distribution of dice thrown per round (up to throw {}):'.format(len(survival)))
+        print('Mean: {:.2f}'.format(throws @ (win_pmf + loss_pmf)))
+        for q in [0.05, 0.25, 0.5, 0.75, 0.95]:
+            print('{:.0f}% quantile: {}'.format(100 * q, throws[np.searchsorted(cdf, q)]))
+        print('Most likely throw to win: {} ({:.2f}%)'.format(throws[win_pmf.argmax()], 100 * win_pmf.max()))
+        print('Most likely throw to lose: {} ({:.2f}%)'.format(throws[loss_pmf.argmax()], 100 * loss_pmf.max()))
+
+    time_end = time.time()
+    time_overall = time_end - time_start
+    print('Overall duration of analysis: ' + str(datetime.timedelta(seconds=time_overall)))
@@ -1,17 +1,27 @@
+import multiprocessing
 import numpy as np
 import matplotlib.pyplot as plt
 import time
 import datetime
 
+from ObstgartenOptimalStrategy import load_policy, lookup_action, policy_file
+from ObstgartenPolicies import PolicyTable
+from ObstgartenBatchSimulation import simulate, simulate_parallel, simulate_until_precision
+import ObstgartenCompiledGame
+from ObstgartenDiceTape import open_tape
+from ObstgartenRules import Rules
+from ObstgartenTelemetry import simulate_streaming, plot_log
+
 """
 Set game parameters
+>> Variants with more trees, a longer raven path or several basket faces: change RULES (see ObstgartenRules)
 """
-NUM_FRUIT = 10
-NUM_RAVEN = 9
-NUM_BASKET = 2
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
 STRATEGY = 'positive'
 # STRATEGY = 'negative'
 # STRATEGY = 'random'
+# STRATEGY = 'optimal'  # requires the policy table exported by ObstgartenOptimalStrategy.py
+POLICY_FILE = policy_file(RULES)
 
 """
 Set simulation parameters
@@ -19,43 +29,49 @@ Set simulation parameters
 NUM_SIM = 10 ** 5
 SEED = 54321
 rng = np.random.RandomState(seed=SEED)
-
-trees = ['cherry', 'apple', 'pear', 'plum']
+ENGINE = 'scalar'  # one game after the other, see game()
+# ENGINE = 'batch'  # many games in lockstep as integer arrays, see ObstgartenBatchSimulation
+# ENGINE = 'parallel'  # batch engine on NUM_WORKERS processes with independent random streams
+# ENGINE = 'sequential'  # batch engine in chunks of BATCH_SIZE until the confidence interval is narrow enough
+# ENGINE = 'compiled'  # one game after the other on an integer array, compiled with numba if available
+# ENGINE = 'stream'  # batch engine in chunks of BATCH_SIZE with checkpoints in LOG_FILE, resumable after interruption
+BATCH_SIZE = 10 ** 5
+NUM_WORKERS = multiprocessing.cpu_count()
+TARGET_HALF_WIDTH = 0.0005  # half-width of the confidence interval, i.e. +-0.05 percentage points
+CONFIDENCE = 0.95
+LOG_FILE = 'MC_Simulation_' + STRATEGY + '_strategy.csv'
+TAPE_FILE = None  # replay a pre-generated dice tape (see ObstgartenDiceTape), e.g. 'dice_tape.npy'
+
+trees = RULES.tree_names
+
+# The array engines take the strategy name or a vectorized strategy (see ObstgartenPolicies)
+batch_strategy = STRATEGY
+if STRATEGY == 'optimal':
+    policy = load_policy(POLICY_FILE, RULES)
+    batch_strategy = PolicyTable(policy, RULES, name='optimal')
 
 """
 Interpretation of possible states
 """
-print('definition: [cherry tree, apple tree, pear tree, plum tree, crow]')
-print('start: [10, 10, 10, 10, 9]')
-print('victory : [0, 0, 0, 0, x_e], where x_e > 0')
-print('defeat: [x_a, x_b, x_c, x_d, 0], where at least one x_i > 0')
+print('definition: [' + ', '.join(t + ' tree' for t in trees) + ', crow]')
+print('start: ' + str([RULES.num_fruit] * RULES.num_trees + [RULES.num_raven]))
+print('victory : [0, ..., 0, x_e], where x_e > 0')
+print('defeat: [x_a, ..., x_d, 0], where at least one x_i > 0')
 
 
 """
-Function A: Throw dice based on next pseudo random number
+Function A: Throw dice based on next pseudo random number (or read it from the game's row of the dice tape)
 """
 
 
-def throw_dice():
-    # Generate random integer between 1 and 6
+def throw_dice(tape_row=None, throw=0):
+    if tape_row is not None:
+        return RULES.symbols[tape_row[throw]]
+
+    # Generate random integer between 1 and the number of faces (6 in the original game)
     global rng
-    number = rng.randint(1, 7)
-
-    if number == 1:
-        result = 'cherry'
-    elif number == 2:
-        result = 'apple'
-    elif number == 3:
-        result = 'pear'
-    elif number == 4:
-        result = 'plum'
-    elif number == 5:
-        result = 'raven'
-    elif number == 6:
-        result = 'basket'
-    else:
-        result = 'error'
-    return result
+    number = rng.randint(1, RULES.num_faces + 1)
+    return RULES.symbols[number - 1]
 
 
 """
@@ -63,26 +79,29 @@ Function B: One whole game
 """
 
 
-def game():
+def game(tape_row=None):
     # Initialize state
-    state = {'cherry': NUM_FRUIT, 'apple': NUM_FRUIT, 'pear': NUM_FRUIT, 'plum': NUM_FRUIT, 'raven': NUM_RAVEN}
+    state = {t: RULES.num_fruit for t in trees}
+    state['raven'] = RULES.num_raven
     game_end = False
     victory = False
 
     global count_num_dice
+    throw = 0
 
     # As long as game is not over, perform another move
     while not game_end:
-        symbol = throw_dice()
+        symbol = throw_dice(tape_row, throw)
+        throw += 1
         count_num_dice += 1
 
         # Special case: basket
         if symbol == 'basket':
 
             # Harvest "num_basket" fruits
-            for i in range(NUM_BASKET):
+            for i in range(RULES.num_basket):
                 # Select default fruit
-                selection = 'cherry'
+                selection = trees[0]
 
                 """
                 Case distinction as a function of chosen STRATEGY
@@ -97,7 +116,7 @@ def game():
 
                 # Always select "emptiest" tree (provided it's not really empty)
                 elif STRATEGY == 'negative':
-                    remaining_fruits = NUM_FRUIT
+                    remaining_fruits = RULES.num_fruit
                     for t in trees:
                         if remaining_fruits >= state[t] > 0:
                             selection = t
@@ -119,7 +138,12 @@ def game():
                         number = rng.randint(0, len(tree_options))
                         selection = tree_options[number]
                     else:
-                        selection = 'cherry'
+                        selection = trees[0]
+
+                # Look up exact optimal tree
+                elif STRATEGY == 'optimal':
+                    remaining = [state[t] for t in trees]
+                    selection = trees[lookup_action(policy, remaining, state['raven'], RULES.num_basket - i)]
 
                 # Replace basket by the selected fruit
                 symbol = selection
@@ -136,7 +160,7 @@ def game():
             game_end = True
             victory = False
         # Check if players have won
-        elif ((state['cherry'] == 0) + (state['apple'] == 0) + (state['pear'] == 0) + (state['plum'] == 0)) == 4:
+        elif all(state[t] == 0 for t in trees):
             game_end = True
             victory = True
         # If no one has won, the game continues
@@ -156,30 +180,69 @@ if __name__ == "__main__":
     num_victories = 0
     history = []
     count_num_dice = 0
+    tape = None if TAPE_FILE is None else open_tape(TAPE_FILE, RULES.num_faces)
+
+    if ENGINE == 'batch':
+        victories, num_dice = simulate(NUM_SIM, strategy=batch_strategy, rng=np.random.default_rng(SEED),
+                                       batch_size=BATCH_SIZE, tape=tape, **RULES._asdict())
+        num_victories = victories.sum()
+        count_num_dice = num_dice.sum()
+        # Running probability every 1000 games
+        running = np.cumsum(victories)
+        history = [running[s - 1] / s for s in range(1000, NUM_SIM + 1, 1000)]
+
+    elif ENGINE == 'parallel':
+        # Only totals are merged across workers, hence no convergence history
+        num_victories, count_num_dice = simulate_parallel(NUM_SIM, strategy=batch_strategy, seed=SEED,
+                                                          num_workers=NUM_WORKERS, batch_size=BATCH_SIZE,
+                                                          tape_path=TAPE_FILE, **RULES._asdict())
+
+    elif ENGINE == 'sequential':
+        # NUM_SIM is the maximum number of games, the actual number depends on the precision reached
+        # (always with fresh dice, the tape is not used here)
+        NUM_SIM, num_victories, count_num_dice, interval = simulate_until_precision(
+            TARGET_HALF_WIDTH, strategy=batch_strategy, rng=np.random.default_rng(SEED), confidence=CONFIDENCE,
+            chunk_size=BATCH_SIZE, max_sim=NUM_SIM, verbose=True, **RULES._asdict())
+
+    elif ENGINE == 'compiled':
+        # Fresh dice from the numba random generator, the tape is not used here
+        num_victories, count_num_dice = ObstgartenCompiledGame.simulate(
+            NUM_SIM, strategy=STRATEGY, seed=SEED, policy=policy if STRATEGY == 'optimal' else None,
+            **RULES._asdict())
+
+    elif ENGINE == 'stream':
+        # Convergence history is streamed to LOG_FILE instead of being kept in memory
+        NUM_SIM, num_victories, count_num_dice = simulate_streaming(
+            LOG_FILE, NUM_SIM, strategy=batch_strategy, seed=SEED, chunk_size=BATCH_SIZE, tape=tape,
+            tape_path=TAPE_FILE, verbose=True, **RULES._asdict())
+        plot_log(LOG_FILE, 'MC_Simulation_' + STRATEGY + '_strategy_' + str(NUM_SIM) + '_runs.png')
 
-    for s in range(1, NUM_SIM + 1):
-        if s % 1000 == 0:
-            prob = num_victories / s
-            history.append(prob)
-        if s % 100000 == 0:
-            print(s)
-            prob = num_victories / s
-            print('Current winning probability: ' + str(prob) + ' = ' + '{:.2f}'.format(round(100 * prob, 2)) + '%')
-        victory = game()
-        if victory:
-            num_victories += 1
+    else:
+        for s in range(1, NUM_SIM + 1):
+            if s % 1000 == 0:
+                prob = num_victories / s
+                history.append(prob)
+            if s % 100000 == 0:
+                print(s)
+                prob = num_victories / s
+                print('Current winning probability: ' + str(prob) + ' = ' + '{:.2f}'.format(round(100 * prob, 2)) + '%')
+            victory = game(None if tape is None else tape[s - 1])
+            if victory:
+                num_victories += 1
 
     prob = num_victories / NUM_SIM
     print('Final winning probability: ' + str(prob) + ' = ' + '{:.2f}'.format(round(100 * prob, 2)) + '%')
     print('Average number of dice thrown per round: ' + str(count_num_dice / NUM_SIM))
+    print('Games per second: {:.0f}'.format(NUM_SIM / (time.time() - time_start)))
 
-    skip = 1
+    if history:
+        skip = 1
 
-    plt.plot(range(1, int(NUM_SIM / 1000 + 1), 1)[skip:], [100 * i for i in history][skip:])
-    plt.xlabel('Number of iterations [$\cdot 10^3$]')
-    plt.ylabel('Winning probability [%]')
-    plt.savefig('MC_Simulation_' + STRATEGY + '_strategy_' + str(NUM_SIM) + '_runs.png')
-    plt.show()
+        plt.plot(range(1, int(NUM_SIM / 1000 + 1), 1)[skip:], [100 * i for i in history][skip:])
+        plt.xlabel('Number of iterations [$\cdot 10^3$]')
+        plt.ylabel('Winning probability [%]')
+        plt.savefig('MC_Simulation_' + STRATEGY + '_strategy_' + str(NUM_SIM) + '_runs.png')
+        plt.show()
 
     time_end = time.time()
     time_overall = time_end - time_start
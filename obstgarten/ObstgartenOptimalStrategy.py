@@ -0,0 +1,157 @@
+import numpy as np
+import time
+
+from ObstgartenStateIndex import num_states, rank_state, rank_tree_array, raw_index_states, unrank_states
+from ObstgartenRules import Rules
+
+"""
+Set game parameters
+"""
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
+
+"""
+Optimal basket strategy by backward induction
+>> Every single basket pick is a decision, taken in the canonical state [fullest tree, ..., emptiest tree, raven]
+>> W_k(s) = winning probability in state s with k picks left in the current basket:
+   W_0(s) = V(s) = winning probability before the next throw
+   W_k(s) = max over all non-empty trees j of W_{k-1}(s - e_j)
+   V(s) = 1/num_faces * (sum_i V(s - e_i) + V(s - raven) + num_basket_faces * W_NUM_BASKET(s))
+>> All successors carry fewer remaining items (apart from self-loops of empty trees), so one sweep in ascending
+   order of remaining items suffices
+>> The policy table maps (state rank, picks left - 1) to the position of the chosen tree in the canonical
+   (descending) order, i.e. 0 = fullest tree. States without any decision are marked with -1
+"""
+
+
+"""
+Function A: Backward induction over all states
+"""
+
+
+def optimal_policy(num_fruit, num_raven, num_basket, num_trees=4, num_basket_faces=1):
+    ranks = np.arange(num_states(num_fruit, num_raven, num_trees))
+    states = unrank_states(ranks, num_fruit, num_raven, num_trees)
+    trees = states[:, :-1]
+    raven = states[:, -1]
+    num_faces = num_trees + 1 + num_basket_faces
+    fruits = trees.sum(axis=1)
+
+    # Rank after removing one fruit from tree j (canonical position), for dice faces and basket picks alike
+    pick_successors = np.empty((len(ranks), num_trees), dtype=np.int64)
+    for j in range(num_trees):
+        outgoing = trees.copy()
+        outgoing[:, j] = np.maximum(outgoing[:, j] - 1, 0)
+        pick_successors[:, j] = rank_tree_array(outgoing) * (num_raven + 1) + raven
+    raven_successors = np.maximum(ranks - 1, 0)
+
+    # values[:, k] = W_k, values[:, 0] = V
+    values = np.zeros((len(ranks), num_basket + 1))
+    values[(fruits == 0) & (raven > 0), :] = 1
+    policy = np.full((len(ranks), num_basket), -1, dtype=np.int8)
+    is_transitive = (fruits > 0) & (raven > 0)
+    level = fruits + raven
+
+    order = np.flatnonzero(is_transitive)
+    order = order[np.argsort(level[order], kind='stable')]
+    boundaries = np.flatnonzero(np.diff(level[order])) + 1
+    for idx in np.split(order, boundaries):
+        succ = pick_successors[idx]
+        can_pick = trees[idx] > 0
+
+        # Decisions: picks only lead to states with fewer fruits, which are already solved
+        for k in range(1, num_basket + 1):
+            candidates = np.where(can_pick, values[succ, k - 1], -np.inf)
+            policy[idx, k - 1] = candidates.argmax(axis=1)
+            values[idx, k] = candidates.max(axis=1)
+
+        # Dice: empty trees lead back to the state itself
+        is_self = succ == idx[:, np.newaxis]
+        p_self = is_self.sum(axis=1) / num_faces
+        other = ((~is_self * values[succ, 0]).sum(axis=1) + values[raven_successors[idx], 0]
+                 + num_basket_faces * values[idx, num_basket])
+        values[idx, 0] = other / num_faces / (1 - p_self)
+
+    return values[:, 0], policy
+
+
+"""
+Function B: Export / import of the policy table
+- indexing "canonical": rows are canonical state ranks, entries canonical positions (as described above)
+- indexing "raw": rows are raw state indices (see ObstgartenStateIndex.raw_index_states), entries tree indices,
+  for policies that depend on the order of the trees (e.g. exported DQN policies)
+>> Files without indexing field are canonical (files without num_trees / num_basket_faces: 4 trees, 1 basket face)
+>> A table only fits the rules it was computed for: load_policy with rules and check_policy raise a ValueError if any
+   rule differs (a table of other rules would be indexed out of place, silently in the compiled engine)
+>> policy_file names the file of the exact optimal policy by all rules, so that variants do not overwrite each other
+"""
+
+
+def policy_file(rules):
+    return 'optimal_policy_{}_{}_{}_{}_{}.npz'.format(rules.num_trees, rules.num_fruit, rules.num_raven,
+                                                      rules.num_basket, rules.num_basket_faces)
+
+
+def save_policy(path, num_fruit, num_raven, num_basket, value, policy, num_trees=4, num_basket_faces=1,
+                indexing='canonical'):
+    np.savez_compressed(path, num_fruit=num_fruit, num_raven=num_raven, num_basket=num_basket,
+                        num_trees=num_trees, num_basket_faces=num_basket_faces, value=value, policy=policy,
+                        indexing=indexing)
+
+
+def load_policy(path, rules=None):
+    with np.load(path) as data:
+        policy = {key: data[key] for key in data.files}
+    policy.setdefault('indexing', np.array('canonical'))
+    policy.setdefault('num_trees', np.array(4))
+    policy.setdefault('num_basket_faces', np.array(1))
+    if rules is not None:
+        check_policy(policy, rules)
+    return policy
+
+
+def check_policy(policy, rules):
+    for key, value in rules._asdict().items():
+        if int(policy[key]) != value:
+            raise ValueError('Policy table was computed for {} = {}, the rules have {}'.format(key, int(policy[key]),
+                                                                                               value))
+
+
+"""
+Function C: Look up the chosen tree for an arbitrary (unsorted) list of trees
+>> Returns the index into the given list of trees
+>> Called for every single pick, hence without checks: load the policy with the rules of the game
+"""
+
+
+def lookup_action(policy, trees, raven, picks_left):
+    if str(policy['indexing']) == 'raw':
+        index = raw_index_states(list(trees) + [raven], int(policy['num_fruit']), int(policy['num_raven']))
+        return max(int(policy['policy'][index, picks_left - 1]), 0)
+
+    state = sorted(trees, reverse=True) + [raven]
+    position = policy['policy'][rank_state(state, int(policy['num_raven'])), picks_left - 1]
+    # No decision left (all trees empty)
+    if position < 0:
+        return 0
+    # Any tree with the chosen number of fruits is equivalent
+    return list(trees).index(state[position])
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+    value, policy = optimal_policy(**RULES._asdict())
+    start_state = [RULES.num_fruit] * RULES.num_trees + [RULES.num_raven]
+    start = rank_state(start_state, RULES.num_raven)
+    print('Optimal winning probability with start in state ' + str(start_state) + ' = ')
+    print('{:.4f}'.format(round(100 * value[start], 4)) + '%')
+    print('Duration of analysis: {:.1f} ms'.format(1000 * (time.time() - time_start)))
+
+    # How often does the optimal strategy deviate from the positive strategy (always pick the fullest tree)?
+    decisions = policy >= 0
+    print('Decisions deviating from positive strategy: {} of {}'.format(
+        (policy[decisions] != 0).sum(), decisions.sum()))
+
+    save_policy(policy_file(RULES), RULES.num_fruit, RULES.num_raven, RULES.num_basket, value, policy,
+                RULES.num_trees, RULES.num_basket_faces)
+    print('Policy table written to ' + policy_file(RULES))
@@ -0,0 +1,95 @@
+import numpy as np
+
+from ObstgartenOptimalStrategy import check_policy
+from ObstgartenStateIndex import rank_tree_array, raw_index_states
+
+"""
+Basket strategies for the vectorized Monte Carlo engine
+>> A strategy is any callable pick(trees, raven, picks_left, rng) that returns for every game the index of the tree
+   to pick from, where trees holds one column per game (rows = trees), raven the raven position per game and
+   picks_left the number of picks left in the current basket (NUM_BASKET, ..., 1)
+>> Picks from an empty tree are void, so a strategy does not need to care about games with empty trees only
+>> Built-in strategies are referred to by name, table-driven policies (exact optimal policy, exported greedy DQN
+   policies) are wrapped in a PolicyTable
+"""
+
+
+"""
+Function A: Built-in strategies
+- "positive": always pick "fullest" tree
+- "negative": always pick "emptiest" tree (provided it's not really empty), the last one on ties like the scalar
+  engines, so that all engines play identical games on a shared dice tape
+- "random": pick any non-empty tree with equal probability (one uniform number per game)
+"""
+
+
+def positive_pick(trees, raven, picks_left, rng):
+    return trees.argmax(axis=0)
+
+
+def negative_pick(trees, raven, picks_left, rng):
+    candidates = np.where(trees > 0, trees, np.iinfo(trees.dtype).max)
+    return len(trees) - 1 - candidates[::-1].argmin(axis=0)
+
+
+def random_pick(trees, raven, picks_left, rng):
+    non_empty = trees > 0
+    # k-th non-empty tree with k uniform in [0, number of non-empty trees)
+    k = (rng.random(trees.shape[1]) * non_empty.sum(axis=0)).astype(np.int64)
+    return (np.cumsum(non_empty, axis=0) > k).argmax(axis=0)
+
+
+STRATEGIES = {'positive': positive_pick, 'negative': negative_pick, 'random': random_pick}
+
+
+"""
+Class B: Policy table indexed by canonical state rank or by raw state index
+>> Table layout as exported by ObstgartenOptimalStrategy.save_policy, -1 where there is no decision
+- canonical: entry [rank, picks_left - 1] is the position of the chosen tree in the canonical (descending) order;
+  the trees of every game are sorted once per call, ranked and the canonical position is mapped back to the
+  index of a tree with that number of fruits
+- raw: entry [raw index, picks_left - 1] is the index of the chosen tree itself, no sorting needed
+>> The rules the table is played under are checked against the rules it was computed for
+"""
+
+
+class PolicyTable:
+
+    def __init__(self, policy, rules, name='table'):
+        check_policy(policy, rules)
+        self.table = np.asarray(policy['policy'])
+        self.num_fruit = int(policy['num_fruit'])
+        self.num_raven = int(policy['num_raven'])
+        self.num_basket = int(policy['num_basket'])
+        self.indexing = str(policy.get('indexing', 'canonical'))
+        self.name = name
+
+    def __call__(self, trees, raven, picks_left, rng):
+        if self.indexing == 'raw':
+            index = raw_index_states(np.vstack((trees, raven)).T, self.num_fruit, self.num_raven)
+            return np.maximum(self.table[index, picks_left - 1], 0)
+
+        order = np.argsort(-trees, axis=0, kind='stable')
+        canonical = np.take_along_axis(trees, order, axis=0)
+        ranks = rank_tree_array(canonical.T) * (self.num_raven + 1) + raven
+        position = np.maximum(self.table[ranks, picks_left - 1], 0)
+        return order[position, np.arange(trees.shape[1])]
+
+
+"""
+Function C: Resolve a strategy given by name or as callable
+"""
+
+
+def get_strategy(strategy):
+    if callable(strategy):
+        return strategy
+    if strategy in STRATEGIES:
+        return STRATEGIES[strategy]
+    raise ValueError('Unknown strategy: ' + str(strategy))
+
+
+def strategy_name(strategy):
+    if isinstance(strategy, str):
+        return strategy
+    return getattr(strategy, 'name', getattr(strategy, '__name__', repr(strategy)))
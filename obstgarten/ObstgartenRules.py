@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+"""
+Rules of an Obstgarten variant, shared by the exact and the Monte Carlo engines
+- num_trees: number of trees (4 in the original game)
+- num_fruit: fruits per tree at the start
+- num_raven: length of the raven path (pieces of the puzzle)
+- num_basket: fruits picked per basket
+- num_basket_faces: number of basket faces on the die
+>> The die has one face per tree, one raven face and NUM_BASKET_FACES basket faces, all equally likely
+>> Dice faces as integers: 0, ..., num_trees - 1 = trees, num_trees = raven, above = basket
+>> The field names match the keyword arguments of the engines, e.g. win_probabilities(strategy=..., **rules._asdict())
+"""
+FRUIT_NAMES = ['cherry', 'apple', 'pear', 'plum']
+
+
+class Rules(namedtuple('Rules', ['num_trees', 'num_fruit', 'num_raven', 'num_basket', 'num_basket_faces'],
+                       defaults=[4, 10, 9, 2, 1])):
+
+    @property
+    def num_faces(self):
+        return self.num_trees + 1 + self.num_basket_faces
+
+    @property
+    def raven_face(self):
+        return self.num_trees
+
+    @property
+    def tree_names(self):
+        return FRUIT_NAMES[:self.num_trees] + ['tree_{}'.format(i + 1) for i in range(len(FRUIT_NAMES), self.num_trees)]
+
+    @property
+    def symbols(self):
+        # Name of every dice face
+        return self.tree_names + ['raven'] + ['basket'] * self.num_basket_faces
+
+
+STANDARD_RULES = Rules()
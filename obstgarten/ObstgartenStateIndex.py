@@ -0,0 +1,122 @@
+import math
+import numpy as np
+
+"""
+Closed-form indexing of the canonical Obstgarten states
+>> A state is [tree, ..., tree, raven], where the order of the trees does not matter
+>> Sorting the trees in ascending order x_0 <= x_1 <= ... turns them into the combination x_0 < x_1 + 1 < x_2 + 2 < ...
+>> Its position in colexicographic order (combinatorial number system) is sum_i binom(x_i + i, i + 1)
+>> The raven counter is appended as the least significant digit: rank = tree_rank * (num_raven + 1) + raven
+
+Properties:
+- rank 0 is the impossible state [0, 0, 0, 0, 0], the start state has the highest rank
+- the tree rank does not depend on the number of fruits: the first binom(num_fruit + num_trees, num_trees)
+  tree ranks are exactly the tree configurations with at most num_fruit fruits per tree
+- removing a fruit or feeding the raven strictly decreases the rank, i.e. ascending rank is a topological order
+"""
+
+
+def num_tree_states(num_fruit, num_trees=4):
+    return math.comb(num_fruit + num_trees, num_trees)
+
+
+def num_states(num_fruit, num_raven, num_trees=4):
+    return num_tree_states(num_fruit, num_trees) * (num_raven + 1)
+
+
+def rank_trees(trees):
+    return sum(math.comb(x + i, i + 1) for i, x in enumerate(sorted(trees)))
+
+
+def rank_state(state, num_raven):
+    return rank_trees(state[:-1]) * (num_raven + 1) + state[-1]
+
+
+def unrank_trees(rank, num_trees=4):
+    # Greedy decomposition in the combinatorial number system, starting with the largest tree
+    trees = []
+    for i in range(num_trees - 1, -1, -1):
+        c = i
+        while math.comb(c + 1, i + 1) <= rank:
+            c += 1
+        rank -= math.comb(c, i + 1)
+        trees.append(c - i)
+    return trees
+
+
+def unrank_state(rank, num_raven, num_trees=4):
+    tree_rank, raven = divmod(rank, num_raven + 1)
+    return unrank_trees(tree_rank, num_trees) + [raven]
+
+
+"""
+Vectorized variants: rank / unrank whole arrays of states (one state per row) at once
+"""
+
+
+def binomial_table(n_max, k_max):
+    # table[n, k] = binom(n, k) for 0 <= n <= n_max, 0 <= k <= k_max
+    table = np.zeros((n_max + 1, k_max + 1), dtype=np.int64)
+    table[:, 0] = 1
+    for n in range(1, n_max + 1):
+        table[n, 1:] = table[n - 1, 1:] + table[n - 1, :-1]
+    return table
+
+
+def rank_tree_array(trees):
+    trees = np.sort(np.asarray(trees, dtype=np.int64), axis=-1)
+    num_trees = trees.shape[-1]
+    offsets = np.arange(num_trees)
+    table = binomial_table(int(trees.max(initial=0)) + num_trees, num_trees)
+    return table[trees + offsets, offsets + 1].sum(axis=-1)
+
+
+def rank_states(states, num_raven):
+    states = np.asarray(states, dtype=np.int64)
+    return rank_tree_array(states[..., :-1]) * (num_raven + 1) + states[..., -1]
+
+
+def unrank_tree_array(ranks, num_fruit, num_trees=4):
+    remaining = np.array(ranks, dtype=np.int64)
+    table = binomial_table(num_fruit + num_trees, num_trees)
+    trees = np.empty(remaining.shape + (num_trees,), dtype=np.int64)
+    for i in range(num_trees - 1, -1, -1):
+        # Largest c with binom(c, i + 1) <= remaining (column is non-decreasing in c)
+        c = np.searchsorted(table[:, i + 1], remaining, side='right') - 1
+        remaining -= table[c, i + 1]
+        trees[..., num_trees - 1 - i] = c - i
+    return trees
+
+
+def unrank_states(ranks, num_fruit, num_raven, num_trees=4):
+    tree_ranks, raven = np.divmod(np.asarray(ranks, dtype=np.int64), num_raven + 1)
+    return np.concatenate((unrank_tree_array(tree_ranks, num_fruit, num_trees), raven[..., np.newaxis]), axis=-1)
+
+
+"""
+Raw (unsorted) states: mixed-radix index
+>> index = ((tree_0 * (num_fruit + 1) + tree_1) * (num_fruit + 1) + ...) * (num_raven + 1) + raven
+>> For tables of policies that depend on the order of the trees (e.g. a DQN fed with the raw state), which the
+   canonical rank cannot represent
+"""
+
+
+def num_raw_states(num_fruit, num_raven, num_trees=4):
+    return (num_fruit + 1) ** num_trees * (num_raven + 1)
+
+
+def raw_index_states(states, num_fruit, num_raven):
+    states = np.asarray(states, dtype=np.int64)
+    index = np.zeros(states.shape[:-1], dtype=np.int64)
+    for t in range(states.shape[-1] - 1):
+        index = index * (num_fruit + 1) + states[..., t]
+    return index * (num_raven + 1) + states[..., -1]
+
+
+def raw_unindex_states(indices, num_fruit, num_raven, num_trees=4):
+    remaining, raven = np.divmod(np.asarray(indices, dtype=np.int64), num_raven + 1)
+    states = np.empty(remaining.shape + (num_trees + 1,), dtype=np.int64)
+    states[..., -1] = raven
+    for t in range(num_trees - 1, -1, -1):
+        remaining, states[..., t] = np.divmod(remaining, num_fruit + 1)
+    return states
@@ -0,0 +1,70 @@
+import itertools
+import multiprocessing
+import time
+import datetime
+import pandas as pd
+
+from ObstgartenMarkovChain import enumerate_states, analyze_chain, CACHE_DIR
+from ObstgartenStateIndex import num_states
+
+"""
+Set sweep parameters
+>> Every combination of the lists below is analyzed with the exact Markov chain (rules as in ObstgartenRules)
+"""
+NUM_TREES = [4]
+NUM_FRUIT = [4, 6, 8, 10]
+NUM_RAVEN = [5, 7, 9]
+NUM_BASKET = [1, 2, 3]
+NUM_BASKET_FACES = [1]
+STRATEGY = ['positive', 'negative', 'random']
+NUM_WORKERS = multiprocessing.cpu_count()
+RESULT_FILE = 'sweep_results.csv'
+
+"""
+Function A: Analyze all configurations sharing the same number of trees, fruits and ravens
+>> The state enumeration only depends on trees, fruits and ravens, so it is computed once per group
+"""
+
+
+def analyze_group(group):
+    (num_trees, num_fruit, num_raven), configurations = group
+    enumeration = enumerate_states(num_fruit, num_raven, num_trees)
+    return [analyze_chain(num_fruit, num_raven, num_basket, strategy, enumeration=enumeration, cache_dir=CACHE_DIR,
+                          num_trees=num_trees, num_basket_faces=num_basket_faces)
+            for num_basket, num_basket_faces, strategy in configurations]
+
+
+"""
+Function B: Sweep over a grid of configurations using a process pool
+>> Returns one tidy table with one row per configuration
+"""
+
+
+def sweep(num_trees_list, num_fruit_list, num_raven_list, num_basket_list, num_basket_faces_list, strategy_list,
+          num_workers=NUM_WORKERS):
+    groups = [((num_trees, num_fruit, num_raven),
+               list(itertools.product(num_basket_list, num_basket_faces_list, strategy_list)))
+              for num_trees, num_fruit, num_raven in itertools.product(num_trees_list, num_fruit_list, num_raven_list)]
+
+    # Largest state spaces first to keep all workers busy until the end
+    groups.sort(key=lambda group: num_states(group[0][1], group[0][2], group[0][0]), reverse=True)
+
+    with multiprocessing.Pool(processes=num_workers) as pool:
+        results = pool.map(analyze_group, groups, chunksize=1)
+
+    table = pd.DataFrame([row for rows in results for row in rows])
+    return table.sort_values(['num_trees', 'num_fruit', 'num_raven', 'num_basket', 'num_basket_faces',
+                              'strategy']).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+
+    table = sweep(NUM_TREES, NUM_FRUIT, NUM_RAVEN, NUM_BASKET, NUM_BASKET_FACES, STRATEGY)
+    table.to_csv(RESULT_FILE, index=False)
+    print(table.to_string(index=False))
+    print('Results written to ' + RESULT_FILE)
+
+    time_overall = time.time() - time_start
+    print('Overall duration of sweep: ' + str(datetime.timedelta(seconds=time_overall)))
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ObstgartenBatchSimulation import play_batch
+from ObstgartenDiceTape import batch_slice
+from ObstgartenPolicies import strategy_name
+
+"""
+Streaming convergence telemetry for long Monte Carlo runs
+>> The games are played in chunks of CHUNK_SIZE with the batch engine; after every chunk one checkpoint row
+   (games, victories, dice, elapsed, games_per_second) is appended to a CSV log and flushed to disk,
+   so nothing but the current chunk is held in memory
+>> The chunk starting with game g always uses the random stream np.random.default_rng([seed, g]) (or the games
+   g, g + 1, ... of the dice tape), hence an interrupted run resumes after the last checkpoint without replaying
+   earlier games and ends with exactly the same totals as an uninterrupted run
+>> The first line of the log holds the run parameters as JSON; resuming with different parameters is refused
+"""
+LOG_FIELDS = ['games', 'victories', 'dice', 'elapsed', 'games_per_second']
+
+
+"""
+Function A: Read the checkpoints of a log
+>> Returns the parameters and the list of complete checkpoint rows (a row cut off by an interruption is ignored)
+"""
+
+
+def read_log(path):
+    with open(path) as file:
+        lines = file.read().split('\n')
+    parameters = json.loads(lines[0][1:])
+    checkpoints = []
+    # Every complete row ends with a newline, so the last element is either empty or a partial row
+    for line in lines[2:-1]:
+        values = line.split(',')
+        if len(values) != len(LOG_FIELDS):
+            break
+        checkpoints.append(dict(zip(LOG_FIELDS, [int(values[0]), int(values[1]), int(values[2]),
+                                                 float(values[3]), float(values[4])])))
+    return parameters, checkpoints
+
+
+"""
+Function B: Open a log for appending, resuming from its last checkpoint if it exists
+>> Returns the open file and the last checkpoint (None for a new log)
+"""
+
+
+def open_log(path, parameters):
+    if not os.path.exists(path):
+        file = open(path, 'w')
+        file.write('#' + json.dumps(parameters, sort_keys=True) + '\n')
+        file.write(','.join(LOG_FIELDS) + '\n')
+        file.flush()
+        return file, None
+
+    logged, checkpoints = read_log(path)
+    if logged != parameters:
+        raise ValueError('Log ' + path + ' was written with different parameters: ' + json.dumps(logged))
+
+    # Drop a partial row left behind by an interruption
+    with open(path) as file:
+        complete = file.read().split('\n')[:2 + len(checkpoints)]
+    with open(path, 'w') as file:
+        file.write('\n'.join(complete) + '\n')
+    return open(path, 'a'), checkpoints[-1] if checkpoints else None
+
+
+"""
+Function C: Simulate NUM_SIM games in total, appending one checkpoint per chunk to the log
+>> Returns the number of games, victories and dice thrown
+"""
+
+
+def simulate_streaming(log_path, num_sim, num_fruit, num_raven, num_basket, strategy, seed,
+                       chunk_size=10 ** 5, tape=None, tape_path=None, verbose=False, num_trees=4, num_basket_faces=1):
+    parameters = {'num_trees': num_trees, 'num_fruit': num_fruit, 'num_raven': num_raven, 'num_basket': num_basket,
+                  'num_basket_faces': num_basket_faces, 'strategy': strategy_name(strategy), 'seed': seed,
+                  'chunk_size': chunk_size, 'tape': tape_path}
+    file, checkpoint = open_log(log_path, parameters)
+
+    games, victories, dice, elapsed = 0, 0, 0, 0.0
+    if checkpoint is not None:
+        games, victories, dice, elapsed = (checkpoint['games'], checkpoint['victories'], checkpoint['dice'],
+                                           checkpoint['elapsed'])
+        if verbose:
+            print('Resuming after {} games'.format(games))
+
+    with file:
+        while games < num_sim:
+            time_before = time.time()
+            size = min(chunk_size, num_sim - games)
+            chunk_tape = None if tape is None else batch_slice(tape, games, games + size)
+            victory, num_dice = play_batch(size, num_fruit, num_raven, num_basket, strategy,
+                                           np.random.default_rng([seed, games]), tape=chunk_tape,
+                                           num_trees=num_trees, num_basket_faces=num_basket_faces)
+
+            duration = time.time() - time_before
+            games += size
+            victories += int(victory.sum())
+            dice += int(num_dice.sum())
+            elapsed += duration
+
+            file.write('{},{},{},{:.3f},{:.0f}\n'.format(games, victories, dice, elapsed, size / duration))
+            file.flush()
+            os.fsync(file.fileno())
+            if verbose:
+                print('{} games: winning probability {:.4f}%'.format(games, 100 * victories / games))
+
+    return games, victories, dice
+
+
+"""
+Function D: Plot the convergence from a log (written to an image file, no interactive window)
+"""
+
+
+def plot_log(log_path, image_path):
+    parameters, checkpoints = read_log(log_path)
+    games = np.array([checkpoint['games'] for checkpoint in checkpoints])
+    victories = np.array([checkpoint['victories'] for checkpoint in checkpoints])
+
+    plt.figure()
+    plt.plot(games / 1000, 100 * victories / games)
+    plt.xlabel('Number of iterations [$\\cdot 10^3$]')
+    plt.ylabel('Winning probability [%]')
+    plt.title(parameters['strategy'] + ' strategy')
+    plt.savefig(image_path)
+    plt.close()
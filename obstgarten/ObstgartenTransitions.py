@@ -0,0 +1,118 @@
+import itertools
+import numpy as np
+
+from ObstgartenStateIndex import rank_states, rank_tree_array
+
+"""
+Vectorized transitions of the Obstgarten game
+>> Given an array of states (one state per row), all outgoing states and probabilities are computed at once
+>> Dice faces: one per tree, raven and NUM_BASKET_FACES baskets (followed by NUM_BASKET picks), all equally likely,
+   i.e. 1/6 each in the original game with 4 trees and one basket face
+>> The number of trees is given by the width of the state array (see ObstgartenRules)
+"""
+
+
+"""
+Function A: All ways to distribute a number of picks over the trees
+>> Array of shape (n_compositions, num_trees), e.g. 2 picks on 4 trees yield 10 compositions
+"""
+
+
+def compositions(total, num_trees):
+    return np.array([c for c in itertools.product(range(total + 1), repeat=num_trees) if sum(c) == total],
+                    dtype=np.int64).reshape(-1, num_trees)
+
+
+"""
+Function B: Probability of picking each tree given the remaining fruits, shape (..., num_trees)
+- STRATEGY "positive": always pick "fullest" tree
+- STRATEGY "negative": always pick "emptiest" tree (provided it's not really empty)
+- STRATEGY "random": pick any non-empty tree with equal probability
+>> Rows without any fruit left get probability zero for every tree
+"""
+
+
+def pick_probabilities(remaining, strategy):
+    non_empty = remaining > 0
+    if strategy == 'positive':
+        pick = remaining.argmax(axis=-1)
+    elif strategy == 'negative':
+        pick = np.where(non_empty, remaining, np.iinfo(remaining.dtype).max).argmin(axis=-1)
+    elif strategy == 'random':
+        return non_empty / np.maximum(non_empty.sum(axis=-1, keepdims=True), 1)
+    else:
+        raise ValueError('Unknown strategy: ' + str(strategy))
+    probs = np.zeros(remaining.shape)
+    np.put_along_axis(probs, pick[..., np.newaxis], 1, axis=-1)
+    return probs * non_empty.any(axis=-1, keepdims=True)
+
+
+"""
+Function C: Possible outcomes of one basket throw
+>> Instead of following every sequence of picks (num_trees^NUM_BASKET branches), the picks are tracked as
+   compositions, i.e. how many fruits were taken from each tree: after i picks there are
+   binom(i + num_trees - 1, num_trees - 1) of them
+>> Returns the tree configurations after NUM_BASKET picks, shape (n_states, n_outcomes, num_trees),
+   and their probabilities, shape (n_states, n_outcomes)
+"""
+
+
+def basket_outcomes(trees, num_basket, strategy):
+    n_states, num_trees = trees.shape
+    current = compositions(0, num_trees)
+    probs = np.ones((n_states, 1))
+
+    for i in range(num_basket):
+        following = compositions(i + 1, num_trees)
+        position = {tuple(c): j for j, c in enumerate(following)}
+        successor = np.array([[position[tuple(c + e)] for e in np.eye(num_trees, dtype=np.int64)] for c in current])
+
+        pick = pick_probabilities(trees[:, np.newaxis, :] - current, strategy)
+        following_probs = np.zeros((n_states, len(following)))
+        for t in range(num_trees):
+            # c -> c + e_t is injective for fixed t, so plain fancy-indexed accumulation is safe
+            following_probs[:, successor[:, t]] += probs * pick[..., t]
+        # If all trees are empty, the remaining picks are void: book them on the first tree (clipped below)
+        following_probs[:, successor[:, 0]] += probs * (1 - pick.sum(axis=-1))
+
+        current = following
+        probs = following_probs
+
+    return np.maximum(trees[:, np.newaxis, :] - current, 0), probs
+
+
+"""
+Function D: Outgoing ranks and probabilities for every state
+>> Returns arrays of shape (n_states, num_trees + 1 + n_outcomes): one column per tree face, raven face
+   and basket outcome. Columns with probability zero are padding
+"""
+
+
+def transitions(states, num_raven, num_basket, strategy, num_basket_faces=1):
+    states = np.asarray(states, dtype=np.int64)
+    trees = states[:, :-1]
+    raven = states[:, -1]
+    num_trees = trees.shape[1]
+    ranks = rank_states(states, num_raven)
+    face_prob = 1 / (num_trees + 1 + num_basket_faces)
+
+    successors = []
+    probs = []
+
+    # Case 1: Regular fruit >> reduce specific tree by one fruit, if possible
+    for i in range(num_trees):
+        outgoing = trees.copy()
+        outgoing[:, i] = np.maximum(outgoing[:, i] - 1, 0)
+        successors.append(rank_tree_array(outgoing) * (num_raven + 1) + raven)
+        probs.append(np.full(len(states), face_prob))
+
+    # Case 2: Crow >> reduce crow by 1, if possible (raven is the least significant digit of the rank)
+    successors.append(np.where(raven > 0, ranks - 1, ranks))
+    probs.append(np.full(len(states), face_prob))
+
+    # Case 3: Basket >> pick NUM_BASKET fruits according to strategy
+    outcomes, outcome_probs = basket_outcomes(trees, num_basket, strategy)
+    successors.append(rank_tree_array(outcomes) * (num_raven + 1) + raven[:, np.newaxis])
+    probs.append(outcome_probs * num_basket_faces * face_prob)
+
+    return np.column_stack(successors), np.column_stack(probs)
@@ -0,0 +1,125 @@
+import itertools
+import math
+import statistics
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from ObstgartenBatchSimulation import simulate
+from ObstgartenDynamicProgramming import win_probabilities
+from ObstgartenMarkovChain import analyze_chain
+from ObstgartenRules import Rules
+
+"""
+Set validation parameters
+>> Every combination of the lists below is solved exactly and simulated with the vectorized engine
+"""
+NUM_TREES = [4, 6]
+NUM_FRUIT = [1, 2, 4]
+NUM_RAVEN = [1, 3, 5]
+NUM_BASKET = [1, 2]
+NUM_BASKET_FACES = [1, 2]
+STRATEGY = ['positive', 'negative', 'random']
+NUM_SIM = 10 ** 5
+SEED = 54321
+CONFIDENCE = 0.999  # family-wise confidence level of all checks together (Bonferroni)
+EXACT_TOLERANCE = 1e-9  # Markov chain and dynamic programming have to agree up to rounding
+
+"""
+Cross-engine validation
+1) Exact engines against each other: Markov chain absorption analysis and dynamic programming
+2) Monte Carlo against exact: winning probability and expected number of dice, checked with z-scores
+   |estimate - exact| / standard error <= z, where z is chosen such that all checks together hold with CONFIDENCE
+3) Timing of every path, so that performance regressions show up next to wrong numbers
+>> Exits with status 1 if any check fails
+"""
+
+
+"""
+Function A: Validate a single configuration
+>> Returns one row with the exact and simulated values, the z-scores and the durations
+"""
+
+
+def validate(rules, strategy, num_sim, rng):
+    chain = analyze_chain(strategy=strategy, cache_dir=None, **rules._asdict())
+
+    time_before = time.time()
+    dp_win = win_probabilities(strategy=strategy, **rules._asdict())[-1]
+    time_dp = time.time() - time_before
+
+    time_before = time.time()
+    victory, num_dice = simulate(num_sim, strategy=strategy, rng=rng, **rules._asdict())
+    time_mc = time.time() - time_before
+
+    mc_win = victory.mean()
+    win_error = math.sqrt(chain['win'] * (1 - chain['win']) / num_sim)
+    length_error = num_dice.std(ddof=1) / math.sqrt(num_sim)
+
+    return {**rules._asdict(),
+            'strategy': strategy,
+            'exact_win': chain['win'],
+            'exact_deviation': abs(chain['win'] - dp_win),
+            'mc_win': mc_win,
+            'z_win': 0.0 if win_error == 0 else (mc_win - chain['win']) / win_error,
+            'exact_length': chain['length'],
+            'mc_length': num_dice.mean(),
+            'z_length': 0.0 if length_error == 0 else (num_dice.mean() - chain['length']) / length_error,
+            'time_chain': chain['duration'],
+            'time_dp': time_dp,
+            'time_mc': time_mc}
+
+
+"""
+Function B: Validate a grid of configurations
+>> Returns the table of all rows and the list of failed checks
+"""
+
+
+def validate_grid(num_trees_list, num_fruit_list, num_raven_list, num_basket_list, num_basket_faces_list,
+                  strategy_list, num_sim, seed, confidence=0.999, exact_tolerance=1e-9):
+    rng = np.random.default_rng(seed)
+    grid = itertools.product(num_trees_list, num_fruit_list, num_raven_list, num_basket_list, num_basket_faces_list)
+    table = pd.DataFrame([validate(Rules(*parameters), strategy, num_sim, rng)
+                          for parameters in grid for strategy in strategy_list])
+
+    # Two two-sided checks per configuration
+    num_checks = 2 * len(table)
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / (2 * num_checks))
+
+    failures = []
+    for row in table.itertuples():
+        name = '{}/{}/{}/{}/{}/{}'.format(row.num_trees, row.num_fruit, row.num_raven, row.num_basket,
+                                          row.num_basket_faces, row.strategy)
+        if row.exact_deviation > exact_tolerance:
+            failures.append(name + ': Markov chain and dynamic programming differ by {:.2e}'.format(
+                row.exact_deviation))
+        if abs(row.z_win) > z:
+            failures.append(name + ': winning probability off by {:.1f} standard errors'.format(row.z_win))
+        if abs(row.z_length) > z:
+            failures.append(name + ': number of dice off by {:.1f} standard errors'.format(row.z_length))
+    return table, failures, z
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+
+    table, failures, z = validate_grid(NUM_TREES, NUM_FRUIT, NUM_RAVEN, NUM_BASKET, NUM_BASKET_FACES, STRATEGY,
+                                       NUM_SIM, SEED, confidence=CONFIDENCE, exact_tolerance=EXACT_TOLERANCE)
+    pd.set_option('display.width', 200)
+    print(table.to_string(index=False, float_format='{:.4f}'.format))
+
+    print('Configurations: {}, games per configuration: {}, critical z-score: {:.2f}'.format(len(table), NUM_SIM, z))
+    print('Total time: Markov chain {:.2f} s, dynamic programming {:.2f} s, Monte Carlo {:.2f} s'.format(
+        table['time_chain'].sum(), table['time_dp'].sum(), table['time_mc'].sum()))
+    print('Monte Carlo throughput: {:.0f} games per second'.format(len(table) * NUM_SIM / table['time_mc'].sum()))
+    print('Overall duration: {:.1f} s'.format(time.time() - time_start))
+
+    if failures:
+        print('FAILED:')
+        for failure in failures:
+            print('  ' + failure)
+        sys.exit(1)
+    print('All checks passed')
@@ -0,0 +1,113 @@
+import math
+import time
+import numpy as np
+
+from ObstgartenBatchSimulation import play_batch
+from ObstgartenDiceTape import generate_tape, batch_slice
+from ObstgartenDynamicProgramming import win_probabilities
+from ObstgartenRules import Rules
+
+"""
+Set game parameters
+>> Variants with more trees, a longer raven path or several basket faces: change RULES (see ObstgartenRules)
+"""
+RULES = Rules(num_trees=4, num_fruit=10, num_raven=9, num_basket=2, num_basket_faces=1)
+STRATEGIES = ['positive', 'negative', 'random']
+CONTROL = 'positive'  # strategy with exactly known winning probability used as control variate
+
+"""
+Set simulation parameters
+"""
+NUM_SIM = 10 ** 5
+SEED = 54321
+BATCH_SIZE = 10 ** 5
+
+"""
+Variance reduction for comparing strategies
+1) Common random numbers: every strategy plays the same games, i.e. consumes the same dice tape (ObstgartenDiceTape),
+   so the differences between strategies are not swamped by the luck of the dice
+2) Control variate: the same game played with a strategy of exactly known winning probability p_c (Markov chain /
+   dynamic programming) is strongly correlated with the target strategy, hence
+   estimate = mean(X) - beta * (mean(C) - p_c) with beta = cov(X, C) / var(C) has a much smaller variance
+>> Variance reduction factor = variance of the plain estimator / variance of the improved estimator,
+   i.e. the factor of games saved for the same precision
+"""
+
+
+"""
+Function A: Play the same games with all strategies
+>> Returns a dict strategy -> array of victories (one entry per game)
+"""
+
+
+def common_random_numbers(num_sim, num_fruit, num_raven, num_basket, strategies, rng, batch_size=10 ** 5,
+                          num_trees=4, num_basket_faces=1):
+    victories = {strategy: np.empty(num_sim, dtype=bool) for strategy in strategies}
+    for start in range(0, num_sim, batch_size):
+        end = min(start + batch_size, num_sim)
+        tape = batch_slice(generate_tape(end - start, num_raven, rng, num_faces=num_trees + 1 + num_basket_faces),
+                           0, end - start)
+        for strategy in strategies:
+            victories[strategy][start:end], num_dice = play_batch(end - start, num_fruit, num_raven, num_basket,
+                                                                  strategy, rng, tape=tape, num_trees=num_trees,
+                                                                  num_basket_faces=num_basket_faces)
+    return victories
+
+
+"""
+Function B: Difference of two strategies on common random numbers
+>> Returns the estimated difference, its standard error and the variance reduction compared to
+   two independent simulations with the same number of games each
+"""
+
+
+def paired_difference(victory_a, victory_b):
+    n = len(victory_a)
+    difference = victory_a.astype(float) - victory_b.astype(float)
+    variance_paired = difference.var(ddof=1)
+    variance_independent = victory_a.var(ddof=1) + victory_b.var(ddof=1)
+    return difference.mean(), math.sqrt(variance_paired / n), variance_independent / variance_paired
+
+
+"""
+Function C: Control variate estimator
+>> Returns the estimated winning probability, its standard error and the variance reduction compared to the
+   plain mean of the target victories
+"""
+
+
+def control_variate(victory, control_victory, control_exact):
+    n = len(victory)
+    x = victory.astype(float)
+    c = control_victory.astype(float)
+    covariance = np.cov(x, c, ddof=1)
+    beta = covariance[0, 1] / covariance[1, 1]
+    estimate = x.mean() - beta * (c.mean() - control_exact)
+    variance = (x - beta * c).var(ddof=1)
+    return estimate, math.sqrt(variance / n), x.var(ddof=1) / variance
+
+
+if __name__ == "__main__":
+
+    time_start = time.time()
+    rng = np.random.default_rng(SEED)
+    victories = common_random_numbers(NUM_SIM, strategies=STRATEGIES, rng=rng, batch_size=BATCH_SIZE,
+                                      **RULES._asdict())
+    exact = {strategy: win_probabilities(strategy=strategy, **RULES._asdict())[-1] for strategy in STRATEGIES}
+
+    print('Common random numbers, {} games per strategy:'.format(NUM_SIM))
+    for a, b in zip(STRATEGIES[:-1], STRATEGIES[1:]):
+        difference, error, reduction = paired_difference(victories[a], victories[b])
+        print('{} - {}: {:+.3f}% +- {:.3f}% (exact {:+.3f}%), variance reduction {:.1f}x'.format(
+            a, b, 100 * difference, 100 * error, 100 * (exact[a] - exact[b]), reduction))
+
+    print('Control variate: strategy ' + CONTROL + ' (exact {:.3f}%)'.format(100 * exact[CONTROL]))
+    for strategy in STRATEGIES:
+        if strategy == CONTROL:
+            continue
+        plain = victories[strategy].mean()
+        estimate, error, reduction = control_variate(victories[strategy], victories[CONTROL], exact[CONTROL])
+        print('{}: plain {:.3f}%, controlled {:.3f}% +- {:.3f}% (exact {:.3f}%), variance reduction {:.1f}x'.format(
+            strategy, 100 * plain, 100 * estimate, 100 * error, 100 * exact[strategy], reduction))
+
+    print('Duration: {:.1f} s'.format(time.time() - time_start))
@@ -2,7 +2,12 @@ import numpy as np
 import torch
 
 from network import DQNNetwork
-from buffer import ExperienceBuffer, Experience
+from buffer import ExperienceBuffer, Experience, PrioritizedExperienceBuffer
+
+from ObstgartenOptimalStrategy import load_policy, lookup_action, save_policy
+from ObstgartenStateIndex import num_raw_states, raw_unindex_states
+from ObstgartenPolicies import PolicyTable
+from ObstgartenRules import Rules
 
 
 def epsilon_decay_schedule(decay_type, total_steps, init_epsilon, min_epsilon, decay_share):
@@ -23,7 +28,7 @@ def epsilon_decay_schedule(decay_type, total_steps, init_epsilon, min_epsilon, d
 
 class Agent:
 
-    def __init__(self, hps, env):
+    def __init__(self, hps, env, buffer=None):
 
         self.hps = hps
         self.env = env
@@ -46,9 +51,15 @@ class Agent:
 
         self.actor_opt = torch.optim.Adam(self.actor.parameters(), lr=self.hps['dqn']['lr'])
 
-        self.buffer = ExperienceBuffer(capacity=self.hps['dqn']['replay_size'], hps=hps)
+        self.prioritized = self.hps['dqn'].get('prioritized', {}).get('enabled', False)
+        buffer_class = PrioritizedExperienceBuffer if self.prioritized else ExperienceBuffer
+        if buffer is None:
+            buffer = buffer_class(capacity=self.hps['dqn']['replay_size'], hps=hps, num_states=self.env.num_states)
+        self.buffer = buffer
         self.state = None
         self.action = None
+        self.states = None
+        self.actions = None
 
         self.epsilon_schedule = epsilon_decay_schedule(
             decay_type=self.hps['dqn']['eps']['strategy'],
@@ -59,24 +70,25 @@ class Agent:
 
         self.epsilon = self.epsilon_schedule[0]
 
+    def encode_states(self, states):
+        # Network input for a batch of states (one row per state)
+        states = np.asarray(states)
+        if self.hps['agent']['one_hot_state']:
+            fruits = np.eye(self.hps['env']['num_fruit'] + 1, dtype=int)[states[:, :-1]].reshape(len(states), -1)
+            raven = np.eye(self.hps['env']['num_raven'] + 1, dtype=int)[states[:, -1]]
+            return np.concatenate((fruits, raven), axis=1)
+        if self.hps['agent']['additional_input']:
+            fullest_tree = np.argmax(states[:, :-1], axis=1)
+            return np.concatenate((states, fullest_tree[:, np.newaxis]), axis=1)
+        return states
+
+    def encode_state(self, state):
+        return self.encode_states(np.asarray(state)[np.newaxis])[0]
+
     def choose_fruit(self, state, reward, is_first):
 
         self.decision_count += 1
-
-        if self.hps['agent']['one_hot_state']:
-            state_input = np.array([], dtype=int)
-            for s in state[:-1]:
-                fruit = np.zeros(shape=self.hps['env']['num_fruit'] + 1, dtype=int)
-                fruit[s] = 1
-                state_input = np.concatenate((state_input, fruit))
-            raven = np.zeros(shape=self.hps['env']['num_raven'] + 1, dtype=int)
-            raven[state[-1]] = 1
-            state_input = np.concatenate((state_input, raven))
-        else:
-            state_input = state
-            if self.hps['agent']['additional_input']:
-                fullest_tree = np.argmax(state[:-1])
-                state_input = np.concatenate((state_input, np.array([fullest_tree])))
+        state_input = self.encode_state(state)
 
         # In evaluation mode, always go for the greedy action
         if self.evaluation_mode:
@@ -101,6 +113,32 @@ class Agent:
 
         return action
 
+    def choose_fruits(self, states, rewards, dones):
+        # Batched counterpart of choose_fruit for VectorObstgarten: states are the current decision states of all
+        # games, rewards and dones the outcome of the previous step (a finished game has already been restarted)
+        self.decision_count += len(states)
+        state_inputs = self.encode_states(states)
+
+        # In evaluation mode, always go for the greedy action
+        if self.evaluation_mode:
+            return self.actor.sample_actions(state_inputs)
+
+        # Store the transitions of the previous step of all games, terminal ones with a dummy next state
+        if self.states is not None:
+            next_states = np.where(dones[:, np.newaxis], 1, state_inputs)
+            self.buffer.append_batch(self.states, self.actions, rewards, next_states, dones)
+            for i in range(int(dones.sum())):
+                self.update_after_game()
+
+        actions = self.actor.sample_actions(state_inputs)
+        explore = self.rng.random(len(states)) < self.epsilon
+        actions[explore] = self.rng.integers(self.env.num_actions, size=explore.sum())
+
+        self.states = state_inputs
+        self.actions = actions
+
+        return actions
+
     def finish_game(self, reward):
         # In evaluation mode, skip training
         if self.evaluation_mode:
@@ -112,9 +150,12 @@ class Agent:
                          next_state=np.ones_like(a=self.state),
                          done=True)
         self.buffer.append(exp)
+        self.update_after_game()
+
+    def update_after_game(self):
         if len(self.buffer) >= self.hps['dqn']['replay_start_size']:
             # Reduce exploring parameter
-            self.epsilon = self.epsilon_schedule[self.game_count]
+            self.epsilon = self.epsilon_schedule[min(self.game_count, len(self.epsilon_schedule) - 1)]
 
             # Train network
             if self.game_count % self.hps['dqn']['skip_train'] == 0:
@@ -129,9 +170,17 @@ class Agent:
     def train_network(self):
         self.actor_opt.zero_grad()
 
-        # Sample a mini-batch from the replay buffer
-        obs_batch, action_batch, reward_batch, next_obs_batch, done_batch = \
-            self.buffer.sample(self.hps['dqn']['batch_size'])
+        # Sample a mini-batch from the replay buffer (prioritized: with importance sampling weights, beta annealed
+        # linearly over all games)
+        if self.prioritized:
+            share = min(1.0, self.game_count / len(self.epsilon_schedule))
+            beta = self.hps['dqn']['prioritized']['beta_start'] + share * (
+                self.hps['dqn']['prioritized']['beta_final'] - self.hps['dqn']['prioritized']['beta_start'])
+            obs_batch, action_batch, reward_batch, next_obs_batch, done_batch, indices, weights = \
+                self.buffer.sample(self.hps['dqn']['batch_size'], beta)
+        else:
+            obs_batch, action_batch, reward_batch, next_obs_batch, done_batch = \
+                self.buffer.sample(self.hps['dqn']['batch_size'])
         obs_batch = torch.tensor(obs_batch, dtype=torch.float32)
         action_batch = torch.tensor(action_batch, dtype=torch.int64)
         reward_batch = torch.tensor(reward_batch, dtype=torch.float32)
@@ -148,17 +197,51 @@ class Agent:
             target_q_values[done_batch] = 0.0
             target_q_values = reward_batch + self.hps['agent']['gamma'] * target_q_values.detach()
 
-        loss = torch.nn.MSELoss()(q_values, target_q_values)
+        if self.prioritized:
+            td_errors = q_values - target_q_values
+            loss = (torch.tensor(weights) * td_errors ** 2).mean()
+            self.buffer.update_priorities(indices, td_errors.detach().abs().numpy())
+        else:
+            loss = torch.nn.MSELoss()(q_values, target_q_values)
 
         loss.backward()
         self.actor_opt.step()
 
+    def export_greedy_policy(self, path):
+        # Greedy action of the actor in every raw state [cherry, apple, pear, plum, raven] (the network input is not
+        # symmetric in the trees), stored as raw-indexed table in the format of ObstgartenOptimalStrategy, so the
+        # Monte Carlo engines can evaluate it as a table
+        num_fruit = self.hps['env']['num_fruit']
+        num_raven = self.hps['env']['num_raven']
+        num_basket = self.hps['env']['num_basket']
+        num_trees = self.hps['env']['num_tree']
+        states = raw_unindex_states(np.arange(num_raw_states(num_fruit, num_raven, num_trees)), num_fruit, num_raven,
+                                    num_trees)
+        with torch.no_grad():
+            q_values = self.actor(torch.tensor(self.encode_states(states), dtype=torch.float32)).numpy()
+
+        # The network does not see the picks left, hence the same action for every pick of a basket
+        policy = np.repeat(q_values.argmax(axis=1).astype(np.int8)[:, np.newaxis], num_basket, axis=1)
+        policy[(states[:, :-1].sum(axis=1) == 0) | (states[:, -1] == 0)] = -1
+        save_policy(path, num_fruit, num_raven, num_basket, q_values.max(axis=1), policy, num_trees,
+                    indexing='raw')
+
     def finish_interaction(self):
         print("Number of training steps: {}".format(self.train_count))
         print("Number of games played: {}".format(self.game_count))
         print("Number of decision: {}".format(self.decision_count))
 
 
+class ActorAgent(Agent):
+    # Acting part of the DQN agent in an actor process (see distributed.py): the transitions go to the learner via
+    # the given buffer, epsilon and the network weights are set by the learner, so there is no training here
+    def __init__(self, hps, env, buffer):
+        super().__init__(hps, env, buffer)
+
+    def update_after_game(self):
+        self.game_count += 1
+
+
 class RandomAgent(Agent):
     def __init__(self, hps, env):
         super().__init__(hps, env)
@@ -167,6 +250,9 @@ class RandomAgent(Agent):
         action = self.rng.choice(self.hps['env']['num_tree'])
         return action
 
+    def choose_fruits(self, states, rewards, dones):
+        return self.rng.integers(self.hps['env']['num_tree'], size=len(states))
+
     def finish_game(self, reward):
         pass
 
@@ -182,6 +268,9 @@ class PositiveAgent(RandomAgent):
         action = np.argmax(state[:-1])
         return action
 
+    def choose_fruits(self, states, rewards, dones):
+        return np.argmax(states[:, :-1], axis=1)
+
 
 class NegativeAgent(RandomAgent):
     def __init__(self, hps, env):
@@ -190,3 +279,23 @@ class NegativeAgent(RandomAgent):
     def choose_fruit(self, state, reward, is_first):
         action = np.argmin(state[:-1])
         return action
+
+    def choose_fruits(self, states, rewards, dones):
+        return np.argmin(states[:, :-1], axis=1)
+
+
+class OptimalAgent(RandomAgent):
+    def __init__(self, hps, env):
+        super().__init__(hps, env)
+        # The environment's die has one basket face
+        rules = Rules(num_trees=hps['env']['num_tree'], num_fruit=hps['env']['num_fruit'],
+                      num_raven=hps['env']['num_raven'], num_basket=hps['env']['num_basket'], num_basket_faces=1)
+        self.policy = load_policy(hps['agent']['policy_file'], rules)
+        self.policy_table = PolicyTable(self.policy, rules, name='optimal')
+
+    def choose_fruit(self, state, reward, is_first):
+        action = lookup_action(self.policy, state[:-1], state[-1], self.env.remaining_baskets_to_choose)
+        return action
+
+    def choose_fruits(self, states, rewards, dones):
+        return self.policy_table(states[:, :-1].T, states[:, -1], self.env.remaining_baskets_to_choose, self.rng)
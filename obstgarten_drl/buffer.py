@@ -5,17 +5,150 @@ Experience = collections.namedtuple('Experience', field_names=['state', 'action'
 
 
 class ExperienceBuffer:
-    def __init__(self, capacity, hps):
-        self.buffer = collections.deque(maxlen=capacity)
+    # Ring buffer with one preallocated array per field (states are small integers or one-hot flags, hence uint8),
+    # so a mini-batch is gathered with one fancy index per field
+    def __init__(self, capacity, hps, num_states):
+        self.capacity = capacity
         self.rng = np.random.default_rng(hps['env']['seed'])
+        self.states = np.zeros((capacity, num_states), dtype=np.uint8)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, num_states), dtype=np.uint8)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
 
     def __len__(self):
-        return len(self.buffer)
+        return self.size
 
     def append(self, experience):
-        self.buffer.append(experience)
+        self.states[self.position] = experience.state
+        self.actions[self.position] = experience.action
+        self.rewards[self.position] = experience.reward
+        self.next_states[self.position] = experience.next_state
+        self.dones[self.position] = experience.done
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def append_batch(self, states, actions, rewards, next_states, dones):
+        indices = (self.position + np.arange(len(states))) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self.position = (self.position + len(states)) % self.capacity
+        self.size = min(self.size + len(states), self.capacity)
 
     def sample(self, batch_size):
-        indices = self.rng.choice(len(self.buffer), batch_size, replace=False)
-        state_batch, action_batch, reward_batch, next_state_batch, done_batch = zip(*[self.buffer[idx] for idx in indices])
-        return np.array(state_batch), np.array(action_batch), np.array(reward_batch), np.array(next_state_batch), np.array(done_batch),
+        indices = self.rng.choice(self.size, batch_size, replace=False)
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], \
+            self.dones[indices]
+
+
+class SumTree:
+    # Binary tree in one array: node n has the children 2n and 2n + 1, the leaves num_leaves, ..., 2 num_leaves - 1
+    # hold the priorities and every inner node the sum of its children (root = node 1 = total priority)
+    # Updates and searches touch one node per level for a whole batch of indices at once, i.e. O(log n) each
+    def __init__(self, capacity):
+        self.depth = max(0, (capacity - 1).bit_length())
+        self.num_leaves = 1 << self.depth
+        self.tree = np.zeros(2 * self.num_leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def priorities(self, indices):
+        return self.tree[indices + self.num_leaves]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices) + self.num_leaves
+        self.tree[nodes] = priorities
+        if len(nodes) == 1:
+            # Single transition (scalar game loop): plain walk up to the root
+            node = int(nodes[0]) // 2
+            while node >= 1:
+                self.tree[node] = self.tree[2 * node] + self.tree[2 * node + 1]
+                node //= 2
+            return
+        for level in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        # Leaf whose cumulative priority range contains each value
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=float)
+        for level in range(self.depth):
+            left = 2 * nodes
+            go_right = (values >= self.tree[left]) & (self.tree[left + 1] > 0)
+            values = np.where(go_right, values - self.tree[left], values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.num_leaves
+
+
+class PrioritizedExperienceBuffer(ExperienceBuffer):
+    # Samples transitions with probability proportional to priority^alpha, where the priority is the absolute TD
+    # error of the last training step (new transitions get the highest priority seen so far); the importance sampling
+    # weights (size * probability)^-beta, normalized to a maximum of 1, correct for the non-uniform sampling
+    def __init__(self, capacity, hps, num_states):
+        super().__init__(capacity, hps, num_states)
+        self.tree = SumTree(capacity)
+        self.alpha = hps['dqn']['prioritized']['alpha']
+        self.epsilon = hps['dqn']['prioritized']['epsilon']
+        self.max_priority = 1.0
+
+    def append(self, experience):
+        position = self.position
+        super().append(experience)
+        self.tree.update(np.array([position]), self.max_priority ** self.alpha)
+
+    def append_batch(self, states, actions, rewards, next_states, dones):
+        indices = (self.position + np.arange(len(states))) % self.capacity
+        super().append_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, self.max_priority ** self.alpha)
+
+    def sample(self, batch_size, beta=1.0):
+        # One value per equally sized segment of the total priority (stratified sampling)
+        total = self.tree.total()
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * total / batch_size
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        weights = (self.size * self.tree.priorities(indices) / total) ** -beta
+        weights = (weights / weights.max()).astype(np.float32)
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], \
+            self.dones[indices], indices, weights
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(indices, priorities ** self.alpha)
+
+
+if __name__ == "__main__":
+    import time
+
+    # Sampling cost at full capacity: uniform vs. prioritized (sample + priority update)
+    CAPACITY = 500000
+    BATCH_SIZE = 5000
+    NUM_STATES = 5
+    REPEAT = 20
+    hps = {'env': {'seed': 123}, 'dqn': {'prioritized': {'alpha': 0.6, 'epsilon': 0.001}}}
+    rng = np.random.default_rng(123)
+
+    for buffer in [ExperienceBuffer(CAPACITY, hps, NUM_STATES), PrioritizedExperienceBuffer(CAPACITY, hps, NUM_STATES)]:
+        time_start = time.time()
+        for start in range(0, CAPACITY, BATCH_SIZE):
+            buffer.append_batch(rng.integers(0, 11, size=(BATCH_SIZE, NUM_STATES)), rng.integers(0, 4, BATCH_SIZE),
+                                np.zeros(BATCH_SIZE), rng.integers(0, 11, size=(BATCH_SIZE, NUM_STATES)),
+                                np.zeros(BATCH_SIZE, dtype=bool))
+        time_fill = time.time() - time_start
+
+        time_start = time.time()
+        for i in range(REPEAT):
+            batch = buffer.sample(BATCH_SIZE)
+            if isinstance(buffer, PrioritizedExperienceBuffer):
+                buffer.update_priorities(batch[5], rng.random(BATCH_SIZE))
+        time_sample = (time.time() - time_start) / REPEAT
+        print('{}: fill {} transitions {:.2f} s, sample (and update) {} transitions {:.2f} ms'.format(
+            type(buffer).__name__, CAPACITY, time_fill, BATCH_SIZE, 1000 * time_sample))
@@ -0,0 +1,210 @@
+import copy
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from agent import ActorAgent
+from environment import VectorObstgarten
+from network import DQNNetwork
+
+# Actor/learner mode: num_actors worker processes play VectorObstgarten games with a copy of the DQN weights, the
+# learner (main process) owns the replay buffer and the optimizer and trains continuously
+# >> Transitions travel in shared-memory blocks, only block indices and counters go through queues
+# >> The learner publishes its weights every sync_every updates in a shared-memory network, the actors pick them up
+#    before their next step; epsilon and the evaluation mode are shared values set by the learner
+# >> The learner trains as fast as it can instead of once every skip_train games, the target network is updated
+#    every skip_copy / skip_train updates (the same number of updates between copies as in the single-process loop)
+
+
+class TransitionChannel:
+    # Shared-memory blocks of transitions from one actor to the learner: the actor fills a free block and hands its
+    # index over via the full queue (shared by all actors), the learner copies it into the replay buffer and returns
+    # the index via the free queue of the actor. Used as the buffer of the ActorAgent (append_batch)
+    def __init__(self, actor_id, num_blocks, block_size, num_states, full_queue, context):
+        self.actor_id = actor_id
+        self.states = torch.zeros((num_blocks, block_size, num_states), dtype=torch.uint8).share_memory_()
+        self.actions = torch.zeros((num_blocks, block_size), dtype=torch.int8).share_memory_()
+        self.rewards = torch.zeros((num_blocks, block_size), dtype=torch.float32).share_memory_()
+        self.next_states = torch.zeros((num_blocks, block_size, num_states), dtype=torch.uint8).share_memory_()
+        self.dones = torch.zeros((num_blocks, block_size), dtype=torch.bool).share_memory_()
+        self.full_queue = full_queue
+        self.free_queue = context.Queue()
+        for block in range(num_blocks):
+            self.free_queue.put(block)
+        self.block = None
+        self.fill = 0
+
+    def arrays(self):
+        # Numpy views on the shared tensors
+        return [tensor.numpy() for tensor in [self.states, self.actions, self.rewards, self.next_states, self.dones]]
+
+    def acquire(self, stop):
+        # Wait for a free block, returns False once the learner has stopped
+        while not stop.is_set():
+            try:
+                self.block = self.free_queue.get(timeout=0.1)
+                self.fill = 0
+                return True
+            except queue.Empty:
+                pass
+        return False
+
+    def append_batch(self, states, actions, rewards, next_states, dones):
+        end = self.fill + len(states)
+        for array, values in zip(self.arrays(), [states, actions, rewards, next_states, dones]):
+            array[self.block, self.fill:end] = values
+        self.fill = end
+
+    def send(self, stats):
+        self.full_queue.put((self.actor_id, self.block, self.fill, stats))
+        self.block = None
+
+
+def run_actor(actor_id, hps, channel, shared_actor, weights_lock, weights_version, epsilon, evaluation, stop):
+    torch.set_num_threads(1)
+    hps = copy.deepcopy(hps)
+    hps['env']['seed'] += 1 + actor_id
+    env = VectorObstgarten(hps, hps['env']['num_parallel_games'])
+    # With a dice tape, actor i plays the games i, i + num_actors, ... of the tape
+    env.tape_offset = actor_id
+    env.tape_stride = hps['distributed']['num_actors']
+    agent = ActorAgent(hps, env, buffer=channel)
+
+    version = -1
+    states = env.reset()
+    rewards = np.zeros(env.num_games)
+    dones = np.zeros(env.num_games, dtype=bool)
+    time_start = time.time()
+    while channel.acquire(stop):
+        for step in range(hps['distributed']['steps_per_block']):
+            if weights_version.value != version:
+                with weights_lock:
+                    version = weights_version.value
+                    agent.actor.load_state_dict(shared_actor.state_dict())
+            agent.epsilon = epsilon.value
+            agent.evaluation_mode = bool(evaluation.value)
+            actions = agent.choose_fruits(states, rewards, dones)
+            states, rewards, dones = env.step(actions)
+        # Cumulative statistics of this actor: finished games, won games, decisions, seconds
+        channel.send((env.num_finished, env.num_won, agent.decision_count, time.time() - time_start))
+
+
+def train_actor_learner(hps, agent):
+    # Runs the whole training with the given (learner) agent, returns the winning probability of every batch
+    context = mp.get_context('spawn')
+    num_actors = hps['distributed']['num_actors']
+    num_games = hps['env']['num_parallel_games']
+    games_per_batch = hps['agent']['games_per_batch']
+    torch.set_num_threads(hps['distributed']['learner_threads'])
+
+    shared_actor = DQNNetwork(num_inputs=agent.env.num_states, num_actions=agent.env.num_actions,
+                              hidden=hps['dqn']['hidden_size'], hps=hps)
+    shared_actor.load_state_dict(agent.actor.state_dict())
+    shared_actor.share_memory()
+    weights_lock = context.Lock()
+    weights_version = context.Value('i', 0)
+    epsilon = context.Value('d', agent.epsilon)
+    evaluation = context.Value('b', agent.evaluation_mode)
+    stop = context.Event()
+
+    full_queue = context.Queue()
+    channels = [TransitionChannel(actor_id, hps['distributed']['blocks_per_actor'],
+                                  hps['distributed']['steps_per_block'] * num_games, agent.env.num_states,
+                                  full_queue, context) for actor_id in range(num_actors)]
+    actors = [context.Process(target=run_actor, daemon=True,
+                              args=(actor_id, hps, channels[actor_id], shared_actor, weights_lock, weights_version,
+                                    epsilon, evaluation, stop)) for actor_id in range(num_actors)]
+    for actor in actors:
+        actor.start()
+
+    actor_stats = np.zeros((num_actors, 4))
+    score_outer = np.zeros(hps['agent']['batches'], dtype=float)
+    batch_index = 0
+    batch_start = {'finished': 0, 'won': 0, 'decisions': 0, 'updates': 0, 'time': time.time()}
+    time_start = time.time()
+    time_ingest = 0.0
+    time_train = 0.0
+    num_transitions = 0
+    copy_every = max(1, hps['dqn']['skip_copy'] // hps['dqn']['skip_train'])
+
+    while batch_index < len(score_outer):
+        if batch_index == len(score_outer) - 1 and not agent.evaluation_mode:
+            agent.evaluation_mode = True
+            evaluation.value = True
+            print("Switch to evaluation mode")
+
+        # A: Copy all blocks that have arrived into the replay buffer (wait for one if there is nothing to train on)
+        ready = len(agent.buffer) >= hps['dqn']['replay_start_size'] and not agent.evaluation_mode
+        time_before = time.time()
+        messages = []
+        try:
+            messages.append(full_queue.get_nowait() if ready else full_queue.get(timeout=1.0))
+            while True:
+                messages.append(full_queue.get_nowait())
+        except queue.Empty:
+            if not messages and not all(actor.is_alive() for actor in actors):
+                raise RuntimeError('Actor process terminated unexpectedly')
+        for actor_id, block, fill, stats in messages:
+            if fill > 0:
+                agent.buffer.append_batch(*[array[block, :fill] for array in channels[actor_id].arrays()])
+                num_transitions += fill
+            channels[actor_id].free_queue.put(block)
+            actor_stats[actor_id] = stats
+        time_ingest += time.time() - time_before
+
+        finished, won, decisions = actor_stats[:, :3].sum(axis=0)
+        agent.game_count = int(finished)
+
+        # B: Batch finished (at least games_per_batch games since the last one): winning probability and throughput
+        if finished - batch_start['finished'] >= games_per_batch:
+            duration = time.time() - batch_start['time']
+            score_outer[batch_index] = (won - batch_start['won']) / (finished - batch_start['finished'])
+            print("Batch: {} \N{tab} Winning probability: {}% \N{tab} Decisions/s: {:.0f} \N{tab} Updates/s: {:.1f}"
+                  .format(batch_index,
+                          np.round(100*score_outer[batch_index], 1),
+                          (decisions - batch_start['decisions']) / duration,
+                          (agent.train_count - batch_start['updates']) / duration))
+            batch_start = {'finished': finished, 'won': won, 'decisions': decisions, 'updates': agent.train_count,
+                           'time': time.time()}
+            batch_index += 1
+
+        # C: Train, update the target network and publish the weights to the actors
+        if ready:
+            time_before = time.time()
+            agent.epsilon = agent.epsilon_schedule[min(agent.game_count, len(agent.epsilon_schedule) - 1)]
+            epsilon.value = agent.epsilon
+            agent.train_network()
+            agent.train_count += 1
+            if agent.train_count % copy_every == 0:
+                agent.target.load_state_dict(agent.actor.state_dict())
+            if agent.train_count % hps['distributed']['sync_every'] == 0:
+                with weights_lock:
+                    shared_actor.load_state_dict(agent.actor.state_dict())
+                    weights_version.value += 1
+            time_train += time.time() - time_before
+
+    # Stop the actors, blocks still in the queue are dropped
+    stop.set()
+    while any(actor.is_alive() for actor in actors):
+        try:
+            while True:
+                full_queue.get_nowait()
+        except queue.Empty:
+            pass
+        for actor in actors:
+            actor.join(timeout=0.1)
+    agent.decision_count = int(actor_stats[:, 2].sum())
+
+    duration = time.time() - time_start
+    for actor_id in range(num_actors):
+        finished, won, decisions, seconds = actor_stats[actor_id]
+        print("Actor {}: {:.0f} decisions/s, {:.0f} games/s".format(actor_id, decisions / seconds, finished / seconds))
+    print("Actors total: {:.0f} decisions/s".format(actor_stats[:, 2].sum() / duration))
+    print("Learner: {:.1f} updates/s while training, {:.1f} updates/s overall, {:.0f} transitions/s received".format(
+        agent.train_count / max(time_train, 1e-9), agent.train_count / duration, num_transitions / duration))
+    print("Learner time: {:.0f}% training, {:.0f}% receiving or waiting for transitions, {:.0f}% other".format(
+        100 * time_train / duration, 100 * time_ingest / duration, 100 * (1 - (time_train + time_ingest) / duration)))
+
+    return score_outer
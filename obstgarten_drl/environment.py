@@ -1,5 +1,7 @@
 import numpy as np
 
+from ObstgartenDiceTape import open_tape
+
 
 class Obstgarten:
 
@@ -17,24 +19,37 @@ class Obstgarten:
         self.state = None
         self.remaining_baskets_to_choose = 0
 
+        # Dice faces 0-5: trees, raven, basket (same order as the dice tapes of ObstgartenDiceTape.py)
+        self.symbols = hps['env']['tree_names'] + ['raven', 'basket']
+
+        # Optionally replay a pre-generated dice tape (one row per game), memory-mapped read-only
+        # >> Game g plays row tape_offset + g * tape_stride, so that several actors can share one tape without
+        #    playing the same games (actor i of n: offset i, stride n)
+        self.tape = None
+        if hps['env'].get('dice_tape'):
+            self.tape = open_tape(hps['env']['dice_tape'], num_faces=len(self.symbols))
+        self.tape_offset = 0
+        self.tape_stride = 1
+        self.game_index = -1
+        self.throw_index = 0
+
+    def tape_faces(self, game_index, throw_index):
+        # Dice of the given games and throws on the tape; running past its end raises instead of replaying games,
+        # which would spoil exact A/B comparisons
+        rows = self.tape_offset + self.tape_stride * np.asarray(game_index)
+        if np.max(rows) >= len(self.tape):
+            raise ValueError('Dice tape exhausted: all {} games have been played'.format(len(self.tape)))
+        if np.max(throw_index) >= self.tape.shape[1]:
+            raise ValueError('Dice tape too short: game still running after {} throws'.format(self.tape.shape[1]))
+        return self.tape[rows, throw_index]
+
     def throw_dice(self):
-        number = self.rng.integers(1, 7)
-
-        if number == 1:
-            result = 'cherry'
-        elif number == 2:
-            result = 'apple'
-        elif number == 3:
-            result = 'pear'
-        elif number == 4:
-            result = 'plum'
-        elif number == 5:
-            result = 'raven'
-        elif number == 6:
-            result = 'basket'
+        if self.tape is not None:
+            number = self.tape_faces(self.game_index, self.throw_index)
+            self.throw_index += 1
         else:
-            result = 'error'
-        return result
+            number = self.rng.integers(0, 6)
+        return self.symbols[number]
 
     def check_for_game_end(self):
         remaining_fruits = self.state['cherry'] + self.state['apple'] + self.state['pear'] + self.state['plum']
@@ -55,6 +70,8 @@ class Obstgarten:
                       'pear': self.hps['env']['num_fruit'],
                       'plum': self.hps['env']['num_fruit'],
                       'raven': self.hps['env']['num_raven']}
+        self.game_index += 1
+        self.throw_index = 0
 
         reward = 0
         game_end = False
@@ -97,3 +114,95 @@ class Obstgarten:
             self.remaining_baskets_to_choose = self.hps['env']['num_basket']
 
         return np.fromiter(self.state.values(), dtype=int), reward, game_end
+
+
+class VectorObstgarten(Obstgarten):
+    # Plays num_games games side by side: states is an int array with one row [cherry, apple, pear, plum, raven]
+    # per game. Every step takes one action per game, finished games are restarted immediately, so all returned
+    # states are decision states (a basket has been thrown and fruits remain to be chosen)
+
+    def __init__(self, hps, num_games):
+        super().__init__(hps)
+        self.num_games = num_games
+        self.num_tree = hps['env']['num_tree']
+        self.states = np.zeros((num_games, self.num_tree + 1), dtype=int)
+        self.remaining_baskets_to_choose = np.zeros(num_games, dtype=int)
+
+        # Position of every game on the dice tape
+        self.game_index = np.full(num_games, -1)
+        self.throw_index = np.zeros(num_games, dtype=int)
+        self.num_started = 0
+
+        # Outcome of all finished games, including those that ended before the first decision
+        self.num_finished = 0
+        self.num_won = 0
+
+    def throw_dice(self, games):
+        if self.tape is not None:
+            faces = self.tape_faces(self.game_index[games], self.throw_index[games])
+            self.throw_index[games] += 1
+            return faces.astype(int)
+        return self.rng.integers(0, self.num_tree + 2, size=len(games))
+
+    def play_until_decision(self, games):
+        # Perform all actions in which the agents have no choice, returns rewards and game ends of the given games
+        rewards = np.zeros(len(games))
+        dones = np.zeros(len(games), dtype=bool)
+        active = np.arange(len(games))
+        while len(active) > 0:
+            rows = games[active]
+            faces = self.throw_dice(rows)
+            basket = faces == self.num_tree + 1
+            self.remaining_baskets_to_choose[rows[basket]] = self.hps['env']['num_basket']
+
+            normal = ~basket
+            fruit_or_raven = self.states[rows[normal], faces[normal]]
+            self.states[rows[normal], faces[normal]] = np.maximum(0, fruit_or_raven - 1)
+
+            won = normal & (self.states[rows, :-1].sum(axis=1) == 0)
+            lost = normal & ~won & (self.states[rows, -1] == 0)
+            rewards[active[won]] = 1
+            dones[active[won | lost]] = True
+            active = active[normal & ~won & ~lost]
+        return rewards, dones
+
+    def start_games(self, games):
+        # Restart the given games until each of them has reached its first decision
+        while len(games) > 0:
+            self.states[games, :-1] = self.hps['env']['num_fruit']
+            self.states[games, -1] = self.hps['env']['num_raven']
+            self.remaining_baskets_to_choose[games] = 0
+            self.game_index[games] = self.num_started + np.arange(len(games))
+            self.throw_index[games] = 0
+            self.num_started += len(games)
+
+            rewards, dones = self.play_until_decision(games)
+            self.num_finished += dones.sum()
+            self.num_won += int(rewards.sum())
+            games = games[dones]
+
+    def reset(self):
+        self.start_games(np.arange(self.num_games))
+        return self.states.copy()
+
+    def step(self, actions):
+        games = np.arange(self.num_games)
+
+        # Perform actions chosen by agent
+        chosen = self.states[games, actions]
+        self.states[games, actions] = np.maximum(0, chosen - 1)
+        self.remaining_baskets_to_choose -= 1
+
+        rewards = (self.states[:, :-1].sum(axis=1) == 0).astype(float)
+        dones = rewards > 0
+
+        # Games with all baskets chosen continue with regular play
+        continuing = np.flatnonzero(~dones & (self.remaining_baskets_to_choose == 0))
+        rewards[continuing], dones[continuing] = self.play_until_decision(continuing)
+
+        # Restart finished games
+        self.num_finished += dones.sum()
+        self.num_won += int(rewards.sum())
+        self.start_games(np.flatnonzero(dones))
+
+        return self.states.copy(), rewards, dones
@@ -31,6 +31,11 @@ class DQNNetwork(nn.Module):
 
         return action
 
+    @torch.no_grad()
+    def sample_actions(self, obs_batch):
+        q_values = self(torch.from_numpy(obs_batch).float())
+        return torch.argmax(q_values, dim=1).numpy()
+
     @torch.no_grad()
     def get_max_value(self, obs_batch):
         q_values = self(obs_batch)
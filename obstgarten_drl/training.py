@@ -1,3 +1,5 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import torch
@@ -5,8 +7,12 @@ import yaml
 import time
 from datetime import datetime
 
-from agent import Agent, PositiveAgent, NegativeAgent, RandomAgent
-from environment import Obstgarten
+# Agents and environment use the tools of the sibling folder (exact optimal policy, policy tables, dice tapes)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'obstgarten'))
+
+from agent import Agent, PositiveAgent, NegativeAgent, RandomAgent, OptimalAgent
+from environment import Obstgarten, VectorObstgarten
+from distributed import train_actor_learner
 
 if __name__ == '__main__':
 
@@ -18,13 +24,20 @@ if __name__ == '__main__':
 
     PLOT_COLORS = ['black', 'tab:red', 'tab:blue', 'tab:green']
 
-    env = Obstgarten(hps)
+    num_parallel_games = hps['env'].get('num_parallel_games', 1)
+    num_actors = hps.get('distributed', {}).get('num_actors', 0) if hps['agent']['type'] == "trained" else 0
+    if num_parallel_games > 1 and num_actors == 0:
+        env = VectorObstgarten(hps, num_parallel_games)
+    else:
+        env = Obstgarten(hps)
     if hps['agent']['type'] == "positive":
         agent = PositiveAgent(hps, env)
     elif hps['agent']['type'] == "negative":
         agent = NegativeAgent(hps, env)
     elif hps['agent']['type'] == "random":
         agent = RandomAgent(hps, env)
+    elif hps['agent']['type'] == "optimal":
+        agent = OptimalAgent(hps, env)
     else:
         agent = Agent(hps, env)
         if hps["agent"]["read_checkpoint"]:
@@ -41,35 +54,56 @@ if __name__ == '__main__':
     score_outer = np.zeros(hps['agent']['batches'], dtype=float)
     score_inner = np.zeros(hps['agent']['games_per_batch'], dtype=float)
     iter_games = 0
-    for batch_index in range(len(score_outer)):
-        if batch_index == len(score_outer)-1:
-            agent.evaluation_mode = True
-            print("Switch to evaluation mode")
-        for iter_index in range(len(score_inner)):
-            # Get initial state from the environment
-            state, reward, game_end = env.initialize_game()
-            is_first = True
-            # Continue game until final state is reached
-            while not game_end:
-                action = agent.choose_fruit(state, reward, is_first)
-                is_first = False
-                state, reward, game_end = env.continue_game(action)
-            # When game is over, inform agent and save last reward
-            agent.finish_game(reward)
-            score_inner[iter_index] = reward
-            iter_games += 1
+    if num_actors > 0:
+        # Actor processes play, this process only trains (see distributed.py)
+        score_outer = train_actor_learner(hps, agent)
+    else:
+        if num_parallel_games > 1:
+            states = env.reset()
+            rewards = np.zeros(num_parallel_games)
+            dones = np.zeros(num_parallel_games, dtype=bool)
+        for batch_index in range(len(score_outer)):
+            if batch_index == len(score_outer)-1:
+                agent.evaluation_mode = True
+                print("Switch to evaluation mode")
+            if num_parallel_games > 1:
+                # All games advance by one decision per step, one forward pass for all of them
+                finished_before = env.num_finished
+                won_before = env.num_won
+                while env.num_finished - finished_before < len(score_inner):
+                    actions = agent.choose_fruits(states, rewards, dones)
+                    states, rewards, dones = env.step(actions)
+                iter_games += env.num_finished - finished_before
+                score_inner[:] = (env.num_won - won_before) / (env.num_finished - finished_before)
+            else:
+                for iter_index in range(len(score_inner)):
+                    # Get initial state from the environment
+                    state, reward, game_end = env.initialize_game()
+                    is_first = True
+                    # Continue game until final state is reached
+                    while not game_end:
+                        action = agent.choose_fruit(state, reward, is_first)
+                        is_first = False
+                        state, reward, game_end = env.continue_game(action)
+                    # When game is over, inform agent and save last reward
+                    agent.finish_game(reward)
+                    score_inner[iter_index] = reward
+                    iter_games += 1
 
-        score_outer[batch_index] = np.mean(score_inner)
+            score_outer[batch_index] = np.mean(score_inner)
 
-        print("Batch: {} \N{tab} Winning probability: {}%".format(
-            batch_index,
-            np.round(100*score_outer[batch_index], 1)))
+            print("Batch: {} \N{tab} Winning probability: {}%".format(
+                batch_index,
+                np.round(100*score_outer[batch_index], 1)))
 
     agent.finish_interaction()
     if hps["agent"]["write_checkpoint"]:
         checkpoint = {"net": agent.actor.state_dict(),
                       "opt": agent.actor_opt.state_dict()}
         torch.save(checkpoint, "checkpoint.pt")
+    if hps['agent']['type'] == "trained" and hps['agent'].get('export_policy'):
+        agent.export_greedy_policy(hps['agent']['export_policy'])
+        print("Greedy policy table written to " + hps['agent']['export_policy'])
 
     """
     PLOT TRAINING PROGRESS